@@ -0,0 +1,148 @@
+"""
+Startup benchmark for the Weather Assistant Bot
+
+Every run happens in a fresh interpreter and reports:
+    - import time of services.CustomWeatherBot (what run.py pays before polling)
+    - WeatherBot construction time
+    - first-reply latency: time until handle_city sends its text reply for
+      one city (needs API keys and network; skip with --skip-reply)
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [--city London]
+        [--skip-reply] [--max-import-ms 500] [--importtime 10]
+
+Exits with status 1 when the median import time exceeds --max-import-ms,
+so it can guard against startup regressions.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+class _BenchMessage:
+    """Stand-in for telegram Message recording when the first reply was sent"""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.first_reply_at: Optional[float] = None
+
+    async def reply_text(self, text: str, **kwargs) -> None:
+        if self.first_reply_at is None:
+            self.first_reply_at = time.perf_counter()
+
+    async def reply_photo(self, photo, **kwargs) -> None:
+        pass
+
+
+def _bench_update(city: str) -> SimpleNamespace:
+    """Build a minimal stand-in for telegram Update carrying a city message"""
+    return SimpleNamespace(
+        message=_BenchMessage(city),
+        effective_user=SimpleNamespace(id=0, username='benchmark', first_name=None, last_name=None),
+        effective_chat=SimpleNamespace(id=0, type='private')
+    )
+
+
+def _child(city: str, skip_reply: bool) -> None:
+    """Measure one cold start and print the results as JSON"""
+    sys.path.insert(0, str(REPO_ROOT))
+
+    started = time.perf_counter()
+    from services.CustomWeatherBot import WeatherBot
+    imported = time.perf_counter()
+    bot = WeatherBot()
+    constructed = time.perf_counter()
+
+    result = {
+        'import_ms': (imported - started) * 1000,
+        'construct_ms': (constructed - imported) * 1000
+    }
+
+    if not skip_reply:
+        update = _bench_update(city)
+
+        async def first_reply() -> None:
+            try:
+                await bot.handle_city(update, None)
+            finally:
+                await bot.http_client.aclose()
+
+        asyncio.run(first_reply())
+        if update.message.first_reply_at is not None:
+            result['first_reply_ms'] = (update.message.first_reply_at - constructed) * 1000
+
+    print(json.dumps(result))
+
+
+def _run_child(args: argparse.Namespace, extra_flags: tuple = ()) -> subprocess.CompletedProcess:
+    command = [sys.executable, *extra_flags, __file__, '--child', '--city', args.city]
+    if args.skip_reply:
+        command.append('--skip-reply')
+    return subprocess.run(command, cwd=REPO_ROOT, capture_output=True, text=True)
+
+
+def _report_importtime(args: argparse.Namespace) -> None:
+    """Print the modules with the highest self import time"""
+    completed = _run_child(args, ('-X', 'importtime'))
+    timings = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        timings.append((int(self_us), int(cumulative_us), module.strip()))
+
+    print("\nSlowest imports (self time):")
+    for self_us, cumulative_us, module in sorted(timings, reverse=True)[:args.importtime]:
+        print(f"  {self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {module}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Number of cold starts measured')
+    parser.add_argument('--city', default='London', help='City used for the first reply')
+    parser.add_argument('--skip-reply', action='store_true', help='Only measure import and construction')
+    parser.add_argument('--max-import-ms', type=float, help='Fail if median import time is above this')
+    parser.add_argument('--importtime', type=int, default=0, help='Show N slowest imports')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.city, args.skip_reply)
+        return 0
+
+    samples: dict[str, list[float]] = {}
+    for _ in range(args.runs):
+        completed = _run_child(args)
+        if completed.returncode != 0:
+            print(completed.stderr, file=sys.stderr)
+            return completed.returncode
+        for name, value in json.loads(completed.stdout.strip().splitlines()[-1]).items():
+            samples.setdefault(name, []).append(value)
+
+    print(f"Cold starts: {args.runs}")
+    for name, values in samples.items():
+        print(
+            f"  {name:<16} min {min(values):8.1f}  "
+            f"median {statistics.median(values):8.1f}  max {max(values):8.1f}"
+        )
+
+    if args.importtime:
+        _report_importtime(args)
+
+    if args.max_import_ms is not None and statistics.median(samples['import_ms']) > args.max_import_ms:
+        print(f"Median import time is above {args.max_import_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
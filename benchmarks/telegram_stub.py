@@ -0,0 +1,185 @@
+"""
+Local stand-in for the Telegram Bot API, for offline load tests
+
+Serves the handful of Bot API methods the bot uses (getMe, getUpdates,
+deleteWebhook, sendMessage, sendPhoto), hands out synthetic city messages
+from many chats and reports how fast they were answered and whether every
+chat got its replies in order.
+
+Usage:
+    python benchmarks/telegram_stub.py [--port 8081] [--updates 1000]
+        [--chats 100] [--cities London,Paris,Tokyo] [--idle 5]
+
+    # in another shell
+    TELEGRAM_BOT_TOKEN=123:stub TELEGRAM_BASE_URL=http://127.0.0.1:8081/bot \\
+        python supervisor.py --workers 4
+
+The stub exits and prints its report once no reply arrived for --idle
+seconds after the first one.
+"""
+import argparse
+import json
+import re
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'StubBot', 'username': 'stub_bot'}
+
+
+class StubState:
+    """Synthetic updates waiting for getUpdates and the replies received so far"""
+
+    def __init__(self, updates: int, chats: int, cities: list[str]):
+        self.pending: list[Dict[str, Any]] = []
+        self.sent_at: Dict[int, float] = {}
+        self.replies: Dict[int, list[int]] = {}  # chat -> update ids answered, in reply order
+        self.latencies: list[float] = []
+        self.messages = 0
+        self.photos = 0
+        self.first_delivery: Optional[float] = None
+        self.last_reply: Optional[float] = None
+        self._per_chat: Dict[int, list[int]] = {}  # chat -> update ids delivered, not answered yet
+        self._condition = threading.Condition()
+        self._next_message_id = 1
+
+        for update_id in range(1, updates + 1):
+            chat_id = 1000 + update_id % chats
+            self.pending.append({
+                'update_id': update_id,
+                'message': {
+                    'message_id': update_id,
+                    'date': int(time.time()),
+                    'chat': {'id': chat_id, 'type': 'private'},
+                    'from': {'id': chat_id, 'is_bot': False, 'first_name': f'user{chat_id}'},
+                    'text': cities[update_id % len(cities)]
+                }
+            })
+
+    def get_updates(self, offset: int, timeout: float) -> list[Dict[str, Any]]:
+        with self._condition:
+            self.pending = [update for update in self.pending if update['update_id'] >= offset]
+            if not self.pending:
+                self._condition.wait(timeout)
+            batch = self.pending[:100]
+            now = time.perf_counter()
+            if batch and self.first_delivery is None:
+                self.first_delivery = now
+            for update in batch:
+                if update['update_id'] not in self.sent_at:
+                    self.sent_at[update['update_id']] = now
+                    self._per_chat.setdefault(update['message']['chat']['id'], []).append(update['update_id'])
+            return batch
+
+    def record_reply(self, chat_id: int, photo: bool) -> Dict[str, Any]:
+        """Count a reply; text replies answer the oldest unanswered update of the chat"""
+        with self._condition:
+            now = time.perf_counter()
+            self.last_reply = now
+            if photo:
+                self.photos += 1
+            else:
+                self.messages += 1
+                waiting = self._per_chat.get(chat_id)
+                if waiting:
+                    update_id = waiting.pop(0)
+                    self.replies.setdefault(chat_id, []).append(update_id)
+                    self.latencies.append(now - self.sent_at[update_id])
+            message_id = self._next_message_id
+            self._next_message_id += 1
+
+        message = {'message_id': message_id, 'date': int(time.time()),
+                   'chat': {'id': chat_id, 'type': 'private'}, 'from': BOT_USER}
+        if photo:
+            message['photo'] = [{'file_id': f'stub-file-{message_id}', 'file_unique_id': f'u{message_id}',
+                                 'width': 1, 'height': 1}]
+        return message
+
+    def report(self) -> str:
+        answered = len(self.latencies)
+        elapsed = (self.last_reply or 0) - (self.first_delivery or 0)
+        latencies = sorted(self.latencies) or [0.0]
+        in_order = all(ids == sorted(ids) for ids in self.replies.values())
+        return (
+            f"Updates delivered: {len(self.sent_at)}, answered: {answered} "
+            f"({self.messages} messages, {self.photos} photos)\n"
+            f"Elapsed: {elapsed:.2f}s, throughput: {answered / elapsed if elapsed > 0 else 0:.1f} updates/s\n"
+            f"Reply latency ms: median {statistics.median(latencies) * 1000:.0f}, "
+            f"p95 {latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000:.0f}, "
+            f"max {latencies[-1] * 1000:.0f}\n"
+            f"Per-chat order preserved: {in_order}"
+        )
+
+
+def _parse_parameters(content_type: str, body: bytes) -> Dict[str, str]:
+    """Decode Bot API parameters sent as urlencoded or multipart form"""
+    if content_type.startswith('multipart/form-data'):
+        boundary = content_type.split('boundary=', 1)[1].strip('"').encode()
+        parameters = {}
+        for part in body.split(b'--' + boundary):
+            headers, _, value = part.partition(b'\r\n\r\n')
+            name = re.search(rb'name="([^"]*)"', headers)
+            if name and b'filename=' not in headers:
+                parameters[name.group(1).decode()] = value.rstrip(b'\r\n').decode(errors='replace')
+        return parameters
+    return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+
+def _make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            method = self.path.rsplit('/', 1)[-1]
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            params = _parse_parameters(self.headers.get('Content-Type', ''), body)
+
+            if method == 'getMe':
+                result: Any = BOT_USER
+            elif method == 'getUpdates':
+                result = state.get_updates(int(params.get('offset', 0)), float(params.get('timeout', 0)))
+            elif method in ('sendMessage', 'sendPhoto'):
+                result = state.record_reply(int(params['chat_id']), photo=method == 'sendPhoto')
+            else:
+                result = True
+
+            payload = json.dumps({'ok': True, 'result': result}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    return Handler
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--updates', type=int, default=1000, help='Synthetic city messages to deliver')
+    parser.add_argument('--chats', type=int, default=100, help='Distinct chats sending them')
+    parser.add_argument('--cities', default='London,Paris,Tokyo,Berlin,Madrid')
+    parser.add_argument('--idle', type=float, default=5.0, help='Stop after this many seconds without replies')
+    args = parser.parse_args()
+
+    state = StubState(args.updates, args.chats, args.cities.split(','))
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), _make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Telegram stub on http://127.0.0.1:{args.port}/bot with {args.updates} updates from {args.chats} chats")
+
+    try:
+        while state.last_reply is None or time.perf_counter() - state.last_reply < args.idle:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    print(state.report())
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,31 @@
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class AlertConfig:
+    """Configuration for threshold based weather alerts"""
+    data_directory: str = "data"
+    store_file: str = "alerts.sqlite3"
+    refresh_interval: float = 600.0  # Watched cities are checked this often...
+    max_observation_age: float = 60.0  # ...against observations at most this old, seconds
+    max_per_chat: int = 10  # Rules one chat can have
+    messages_per_second: float = 25.0  # Below Telegram's ~30 messages/s broadcast limit
+    max_concurrent_sends: int = 10
+    message_template: str = "⚠️ Weather alert:\n\n{alerts}"
+    # Supervisor sharding (env BOT_WORKER_INDEX / BOT_WORKERS): a worker only
+    # watches the rules of chats routed to it, chat_id % workers == worker_index
+    worker_index: Optional[int] = None
+    workers: Optional[int] = None
+
+    def __post_init__(self):
+        if self.worker_index is None:
+            self.worker_index = int(os.environ.get('BOT_WORKER_INDEX', 0))
+        if self.workers is None:
+            self.workers = int(os.environ.get('BOT_WORKERS', 1))
+
+    @property
+    def store_path(self) -> Path:
+        return Path(self.data_directory) / self.store_file
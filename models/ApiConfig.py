@@ -9,6 +9,12 @@ class ApiConfig:
     """Configuration for API endpoints and keys"""
     base_url: str = "https://api.api-ninjas.com/v1"
     api_key_file: str = 'private_api_ninjas_key.txt'
+    city_cache_size: int = 2048
+    city_cache_ttl: float = 7 * 24 * 3600  # City metadata practically never changes
+    event_buffer_size: int = 20  # Random events kept ready for handlers
+    event_refill_interval: float = 1.0  # Min delay between two buffer refills, seconds
+    event_reuse_ratio: float = 0.8  # Share of events drawn from already cached years...
+    event_min_cached_years: int = 50  # ...once at least this many years are cached
 
     @property
     def api_utils_key_path(self):
@@ -1,4 +1,6 @@
+import os
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -7,12 +9,67 @@ class BotConfig:
     telegram_key_file: str = 'private_telegram_key.txt'
     preserved_words: list[str] = None
     messages: dict[str, str] = None
+    response_deadline: float = 8.0  # Overall budget for the text reply, seconds
+    section_timeouts: dict[str, float] = None
+    max_cities: int = 10  # Cities answered for one multi-city message
+    admin_user_ids: list[int] = None  # May use /stats (env ADMIN_USER_IDS, comma separated)
+    telegram_base_url: Optional[str] = None  # Bot API server, e.g. a local stand-in (env TELEGRAM_BASE_URL)
+    # Update delivery: 'polling' or 'webhook' (env BOT_MODE overrides the default)
+    mode: str = None
+    webhook_listen: str = None  # Address the embedded HTTP server binds to
+    webhook_port: int = None  # Defaults to $PORT, which Heroku-like hosts provide
+    webhook_path: str = None  # URL path Telegram posts updates to
+    webhook_url: Optional[str] = None  # Public base URL registered with Telegram
+    webhook_secret: Optional[str] = None  # Checked against X-Telegram-Bot-Api-Secret-Token
+    webhook_max_connections: int = None  # Concurrent HTTPS connections Telegram opens
+
+    @property
+    def use_webhook(self) -> bool:
+        return self.mode == 'webhook'
+
+    @property
+    def webhook_endpoint(self) -> str:
+        """Full URL Telegram delivers updates to"""
+        return f"{self.webhook_url.rstrip('/')}/{self.webhook_path.lstrip('/')}"
 
     @property
     def telegram_key_path(self) -> str:
         return self.telegram_key_file
 
     def __post_init__(self):
+        if self.admin_user_ids is None:
+            self.admin_user_ids = [
+                int(user_id) for user_id in os.environ.get('ADMIN_USER_IDS', '').split(',') if user_id.strip()
+            ]
+        if self.telegram_base_url is None:
+            self.telegram_base_url = os.environ.get('TELEGRAM_BASE_URL')
+        if self.mode is None:
+            self.mode = os.environ.get('BOT_MODE', 'polling').lower()
+        if self.mode not in ('polling', 'webhook'):
+            raise ValueError(f"Unknown bot mode: {self.mode}")
+        if self.webhook_listen is None:
+            self.webhook_listen = os.environ.get('WEBHOOK_LISTEN', '0.0.0.0')
+        if self.webhook_port is None:
+            self.webhook_port = int(os.environ.get('PORT', 8443))
+        if self.webhook_path is None:
+            self.webhook_path = os.environ.get('WEBHOOK_PATH', 'telegram')
+        if self.webhook_url is None:
+            self.webhook_url = os.environ.get('WEBHOOK_URL')
+        if self.webhook_secret is None:
+            self.webhook_secret = os.environ.get('WEBHOOK_SECRET')
+        if self.webhook_max_connections is None:
+            self.webhook_max_connections = int(os.environ.get('WEBHOOK_MAX_CONNECTIONS', 40))
+        if self.use_webhook and not self.webhook_url:
+            raise ValueError("Webhook mode needs webhook_url (env WEBHOOK_URL)")
+
+        if self.section_timeouts is None:
+            self.section_timeouts = {
+                'weather': 6.0,
+                'population': 3.0,
+                'event': 2.0,
+                'image': 6.0
+            }
+
         if self.preserved_words is None:
             self.preserved_words = [
                 'orgrimar', 'Orgrimmar', 'orgrimmar', 'Orgri', 'Orgrimar',
@@ -36,10 +93,17 @@ class BotConfig:
                     "1️⃣ Get weather - just type a city name\n"
                     "2️⃣ View population stats - included with weather\n"
                     "3️⃣ Learn history - random event with each request\n"
-                    "4️⃣ See images - automatic with each weather request\n\n"
+                    "4️⃣ See images - automatic with each weather request\n"
+                    "5️⃣ Compare cities - send several separated by commas (London, Paris, Tokyo)\n\n"
                     "Commands:\n"
                     "/start - Start the bot\n"
                     "/help - Show this help message\n"
+                    "/subscribe <city> <HH:MM> - Daily weather digest at that local time\n"
+                    "/unsubscribe [city] - Stop digests for a city (or all)\n"
+                    "/subscriptions - List your digests\n"
+                    "/alert <city> <field> <op> <value> - Alert when the weather crosses a threshold\n"
+                    "/alerts - List your alerts\n"
+                    "/unalert [id] - Remove an alert (or all)\n"
                     "/stop - Stop the bot"
                 ),
                 'stop': (
@@ -62,5 +126,36 @@ class BotConfig:
                     "👥 City population info:\n{population_info}\n\n"
                     "📜 Random historical event:\n{random_event}\n\n"
                     "🖼️ Below we have a random image for you. Enjoy!"
-                )
+                ),
+                'multi_response_template': (
+                    "🌍 Weather in your cities:\n{weather_info}\n\n"
+                    "📜 Random historical event:\n{random_event}\n\n"
+                    "🖼️ Below we have a random image for you. Enjoy!"
+                ),
+                'too_many_cities': "\n\n✂️ Only the first {count} cities are shown.",
+                'weather_timeout': "Weather service is slow right now. Please, try again in a moment.",
+                'population_timeout': "City facts are taking too long this time.",
+                'event_timeout': "Nothing to show this time",
+                'image_timeout': "🖼️ The image is running late this time, sorry!",
+                'subscribe_usage': "Usage: /subscribe <city> <HH:MM>, e.g. /subscribe London 08:00",
+                'subscribe_limit': "📭 You can have up to {count} digests. Remove one with /unsubscribe <city> first.",
+                'subscribed': "📬 Daily digest for {city} is set for {time} local time.",
+                'unsubscribed': "📭 Removed {count} digest subscription(s).",
+                'no_subscriptions': "You have no digests yet. Try /subscribe London 08:00",
+                'subscriptions': "📬 Your daily digests:\n{subscriptions}",
+                'alert_usage': (
+                    "Usage: /alert <city> <field> <op> <value>, for example:\n"
+                    "/alert London temperature < -5\n"
+                    "/alert Tokyo wind > 15\n"
+                    "/alert Miami condition = thunderstorm\n\n"
+                    "Fields: temperature and feels_like (°C), wind (m/s), humidity (%), pressure (hPa), condition\n"
+                    "Operators: < <= > >= ="
+                ),
+                'alert_limit': "🔔 You can have up to {count} alerts. Remove one with /unalert <id> first.",
+                'alert_added': "🔔 Alert #{id} set: {rule}. You'll hear from me when it happens.",
+                'alerts_removed': "🔕 Removed {count} alert(s).",
+                'no_alerts': "You have no alerts yet. Try /alert London temperature < 0",
+                'alerts': "🔔 Your alerts:\n{alerts}",
+                'rate_limited': "🐢 Easy there! Too many requests, please wait a few seconds and try again.",
+                'timing_note': "\n\n⏱️ Skipped for being too slow: {sections}"
             }
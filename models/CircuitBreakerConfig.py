@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class CircuitBreakerConfig:
+    """Thresholds of the per-upstream circuit breakers"""
+    consecutive_failures: int = 5  # Open after this many failures in a row...
+    error_rate: float = 0.5  # ...or once this share of the recent calls failed
+    window_size: int = 20  # Recent calls considered for the error rate
+    min_calls: int = 10  # Calls needed in the window before the error rate counts
+    open_seconds: float = 30.0  # Time calls fail fast before a trial call is let through
+    half_open_max_calls: int = 1  # Trial calls in flight while half-open
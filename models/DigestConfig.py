@@ -0,0 +1,19 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class DigestConfig:
+    """Configuration for daily weather digest subscriptions"""
+    data_directory: str = "data"
+    store_file: str = "subscriptions.sqlite3"
+    tick_seconds: float = 30.0  # How often due subscriptions are collected
+    batch_size: int = 5000  # Due subscriptions handled per round
+    max_per_chat: int = 5  # Cities one chat can subscribe to
+    messages_per_second: float = 25.0  # Below Telegram's ~30 messages/s broadcast limit
+    max_concurrent_sends: int = 10
+    message_template: str = "☀️ Your daily weather digest:\n\n{reports}"
+
+    @property
+    def store_path(self) -> Path:
+        return Path(self.data_directory) / self.store_file
@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class FileCacheConfig:
+    """Configuration for the Telegram file_id cache of sent images"""
+    data_directory: str = "data"
+    cache_file: str = "telegram_files.sqlite3"
+    max_entries: int = 5000  # Least recently used entries beyond this are evicted
+    catalog_fallback: bool = True  # Resend a known image when no fresh one is ready
+    busy_timeout: float = 5.0  # Wait for other processes' writes this long, seconds
+
+    @property
+    def cache_path(self) -> Path:
+        return Path(self.data_directory) / self.cache_file
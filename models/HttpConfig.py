@@ -0,0 +1,41 @@
+from dataclasses import dataclass
+
+import httpx
+
+
+@dataclass
+class HttpConfig:
+    """Configuration for pooled async HTTP connections to upstream APIs"""
+    connect_timeout: float = 3.0
+    read_timeout: float = 10.0
+    write_timeout: float = 10.0
+    pool_timeout: float = 5.0
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    # Per-host request deadline derived from observed latency, capped by read_timeout
+    adaptive_timeout: bool = True
+    timeout_percentile: float = 0.99
+    timeout_multiplier: float = 3.0  # Deadline = percentile latency * multiplier...
+    min_request_timeout: float = 3.0  # ...but never below this
+    latency_samples: int = 200  # Recent successful calls kept per host
+    min_latency_samples: int = 20  # Until then read_timeout applies
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        """Build per-phase timeouts for the underlying client"""
+        return httpx.Timeout(
+            connect=self.connect_timeout,
+            read=self.read_timeout,
+            write=self.write_timeout,
+            pool=self.pool_timeout
+        )
+
+    @property
+    def limits(self) -> httpx.Limits:
+        """Build connection pool limits for the underlying client"""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class ImagePoolConfig:
+    """Configuration for the random image prefetch pool"""
+    size_per_category: int = 5  # Images kept ready for every category
+    categories: list[Optional[str]] = field(default_factory=lambda: [None])  # None = any category
+    max_bytes: int = 20 * 1024 * 1024  # Memory cap for all pooled images
+    max_concurrent_fetches: int = 2
+    refill_interval: float = 0.5  # Min delay between starting two refill fetches, seconds
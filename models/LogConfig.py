@@ -1,5 +1,7 @@
+import os
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 import logging
 
 @dataclass
@@ -11,7 +13,24 @@ class LogConfig:
     date_format: str = "%Y-%m-%d %H:%M:%S"
     encoding: str = "utf-8"
     level: int = logging.ERROR
+    dedup_window: float = 60.0  # Identical events within this window are collapsed, seconds
+    max_bytes: int = 5 * 1024 * 1024  # Rotate when the file would grow past this (0 disables)
+    rotate_interval: Optional[float] = 24 * 3600  # Rotate files older than this, seconds
+    backup_count: int = 10  # Compressed segments kept
+    retention_days: Optional[float] = 30.0  # Compressed segments older than this are deleted
+    # Supervisor worker writing these logs (env BOT_WORKER_INDEX); each worker gets its own folder
+    worker_index: Optional[int] = None
+
+    def __post_init__(self):
+        if self.worker_index is None and os.environ.get('BOT_WORKER_INDEX'):
+            self.worker_index = int(os.environ['BOT_WORKER_INDEX'])
+
+    @property
+    def logs_folder(self) -> Path:
+        if self.worker_index is None:
+            return Path(self.base_logs_folder)
+        return Path(self.base_logs_folder) / f"worker-{self.worker_index}"
 
     @property
     def error_logs_path(self) -> str:
-        return str(Path(self.base_logs_folder)/self.log_file)
\ No newline at end of file
+        return str(self.logs_folder/self.log_file)
\ No newline at end of file
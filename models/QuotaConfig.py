@@ -0,0 +1,38 @@
+import os
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+@dataclass
+class QuotaConfig:
+    """Upstream call budgets and per-user rate limits"""
+    # Upstream host -> calls allowed per window (free tier limits, with some headroom)
+    upstream_limits: dict[str, dict[str, int]] = field(default_factory=lambda: {
+        'api.openweathermap.org': {'minute': 55, 'day': 30000},  # 60/min, 1M/month
+        'api.api-ninjas.com': {'minute': 30, 'day': 300}  # 10k/month
+    })
+    low_priority_reserve: float = 0.2  # Share of every window kept for high priority calls
+    user_burst: int = 5  # City requests a user can send in a row...
+    user_refill_seconds: float = 12.0  # ...then one more every this many seconds
+    max_tracked_users: int = 10000
+    # Processes spending the budgets side by side (env BOT_WORKERS); each gets an equal share
+    workers: Optional[int] = None
+    # Most processes the budgets can be shared by, one call per window each
+    max_workers: int = field(init=False, default=0)
+
+    def __post_init__(self):
+        if self.workers is None:
+            self.workers = int(os.environ.get('BOT_WORKERS', 1))
+        self.max_workers = min(
+            (limit for limits in self.upstream_limits.values() for limit in limits.values()), default=1
+        )
+        if self.workers > self.max_workers:
+            # Shares rounded up to one call would add up to more than the provider allows
+            raise ValueError(
+                f"{self.workers} workers can't share the upstream budgets, at most {self.max_workers} can"
+            )
+        if self.workers > 1:
+            self.upstream_limits = {
+                host: {window: limit // self.workers for window, limit in limits.items()}
+                for host, limits in self.upstream_limits.items()
+            }
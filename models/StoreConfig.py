@@ -0,0 +1,16 @@
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class StoreConfig:
+    """Configuration for the persistent city metadata store"""
+    data_directory: str = "data"
+    store_file: str = "city_store.sqlite3"
+    max_age: float = 30 * 24 * 3600  # Rows older than this are refetched, seconds
+    write_batch_size: int = 100
+    flush_interval: float = 2.0  # Max delay before queued writes hit the disk, seconds
+
+    @property
+    def store_path(self) -> Path:
+        return Path(self.data_directory) / self.store_file
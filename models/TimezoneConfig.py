@@ -4,4 +4,7 @@ from dataclasses import dataclass
 class TimezoneConfig:
     """Configuration for timezone service"""
     default_time_format: str = "%H-%M"
-    default_timezone: str = "UTC"
\ No newline at end of file
+    default_timezone: str = "UTC"
+    coordinate_precision: int = 2  # Decimal places of the location key, ~1 km
+    cache_size: int = 4096
+    cache_ttl: float = 24 * 3600
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class UpdateProcessorConfig:
+    """Configuration for concurrent Telegram update processing"""
+    max_concurrent_updates: int = 64  # Updates handled at the same time, across all chats
+    max_pending_updates: int = 1000  # Updates waiting for a slot before new ones are dropped
+    wait_samples: int = 1000  # Recent queue wait times kept for percentiles
@@ -1,3 +1,4 @@
+import os
 from dataclasses import dataclass
 from typing import Optional
 from pathlib import Path
@@ -8,12 +9,46 @@ from datetime import datetime
 class UserLogConfig:
     """Configuration for user request logging"""
     log_directory: str = "logs"
-    user_log_file: str = 'user_requests.json'
+    user_log_file: str = 'user_requests.jsonl'
+    legacy_log_file: str = 'user_requests.json'  # Pre-JSONL array format, migrated once
+    index_file: str = 'user_requests.idx'
     date_format: str = "%Y-%m-%d %H:%M:%S"
+    flush_batch_size: int = 200  # Buffered requests that trigger an early flush
+    flush_interval: float = 1.0  # Max delay before buffered requests hit the disk, seconds
+    archive_directory: str = 'archive'
+    segment_seconds: int = 24 * 3600  # Active log is rolled into one archive segment per period
+    retention_days: Optional[float] = 365.0  # Archive segments older than this are deleted
+    compaction_interval: float = 3600.0  # Sealed logs and retention are also checked this often, seconds
+    # Supervisor worker writing this log (env BOT_WORKER_INDEX); logs, index and archive
+    # are per worker since appends, seals and compaction assume a single writer
+    worker_index: Optional[int] = None
+
+    def __post_init__(self):
+        if self.worker_index is None and os.environ.get('BOT_WORKER_INDEX'):
+            self.worker_index = int(os.environ['BOT_WORKER_INDEX'])
+
+    @property
+    def directory(self) -> Path:
+        if self.worker_index is None:
+            return Path(self.log_directory)
+        return Path(self.log_directory) / f"worker-{self.worker_index}"
 
     @property
     def log_path(self) -> Path:
-        return Path(self.log_directory) / self.user_log_file
+        return self.directory / self.user_log_file
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / self.index_file
+
+    @property
+    def archive_path(self) -> Path:
+        return self.directory / self.archive_directory
+
+    @property
+    def legacy_log_path(self) -> Path:
+        # Written before workers existed, so always at the shared root
+        return Path(self.log_directory) / self.legacy_log_file
 
 
 @dataclass
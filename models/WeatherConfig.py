@@ -8,6 +8,16 @@ class WeatherConfig:
     temp_precision: int = 1
     celsius_symbol: str = "°C"
     fahrenheit_symbol: str = "°F"
+    cache_size: int = 1000
+    cache_ttl: float = 600.0  # OWM refreshes observations roughly every 10 minutes
+    stale_ttl: float = 600.0  # Window a stale observation is served while refreshing
+    group_size: int = 20  # City ids per /group request (OWM maximum)
+    batch_concurrency: int = 5  # Parallel single-city requests for cities without a known id
+    hedge_requests: bool = True  # Send a duplicate request when the first one is slow
+    hedge_percentile: float = 0.95  # Hedge once a call takes longer than this share of recent calls...
+    hedge_min_delay: float = 0.2  # ...but never sooner than this, seconds
+    hedge_max_rate: float = 0.05  # At most this share of calls gets a duplicate
+    hedge_burst: float = 5.0  # Hedges that can be spent at once after a quiet period
 
     @property
     def own_api_key_path(self):
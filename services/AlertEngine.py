@@ -0,0 +1,303 @@
+import asyncio
+import math
+import operator
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from models.AlertConfig import AlertConfig
+from services.WeatherService import OpenWeatherMapAPI, WeatherData
+from utils.AlertStore import AlertRule, AlertStore
+from utils.Cache import normalize_city_name
+from utils.ErrorLogger import logEvent
+from utils.PacedSender import PacedSender
+
+# Watchable fields and how to read them from an observation (°C, m/s, %, hPa)
+FIELDS: Dict[str, Callable[[WeatherData], Any]] = {
+    'temperature': lambda weather_data: round(weather_data.temperature.celsius, 1),
+    'feels_like': lambda weather_data: round(weather_data.feels_like.celsius, 1),
+    'wind': lambda weather_data: weather_data.wind_speed,
+    'humidity': lambda weather_data: weather_data.humidity,
+    'pressure': lambda weather_data: weather_data.pressure,
+    'condition': lambda weather_data: weather_data.condition.lower()
+}
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '=': operator.eq
+}
+
+# Field value of a city that was never observed
+_UNSEEN = object()
+
+
+class AlertEngine:
+    """
+    Notifies chats when the weather of a city crosses their thresholds
+
+    Rules are kept in memory indexed by city and field. Every refresh fetches
+    the distinct watched cities as one batch, compares each observation with
+    the previous one and evaluates only the rules on fields that changed, so
+    a refresh costs in proportion to what changed rather than to the number
+    of rules. A rule notifies when its condition starts to hold and stays
+    quiet until the condition has cleared again.
+    """
+
+    def __init__(
+            self,
+            weather_api: OpenWeatherMapAPI,
+            store: Optional[AlertStore] = None,
+            config: Optional[AlertConfig] = None
+    ):
+        """
+        Initialize engine
+
+        Args:
+            weather_api: Weather API used for the batched refreshes
+            store: Rule store
+            config: Refresh and send rate settings
+        """
+        self.config = config or AlertConfig()
+        self.weather_api = weather_api
+        self.store = store or AlertStore(self.config)
+        # Chats that blocked the bot lose their rules
+        self.sender = PacedSender(
+            self.config.messages_per_second, self.config.max_concurrent_sends, self.remove_rules
+        )
+        # city key -> field -> rule id -> rule
+        self._rules: Dict[str, Dict[str, Dict[int, AlertRule]]] = {}
+        self._by_chat: Dict[int, Dict[int, AlertRule]] = {}
+        self._cities: Dict[str, str] = {}  # city key -> name to fetch it by
+        self._snapshots: Dict[str, Dict[str, Any]] = {}  # city key -> field -> last value
+        self._unchecked: Dict[str, set[str]] = {}  # city key -> fields of rules added since the last refresh
+        self._send: Optional[Callable[[int, str], Awaitable[Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.cities_changed = 0
+        self.evaluations = 0
+        self.fetch_failures = 0
+        self.last_refresh_ms = 0.0
+
+    @staticmethod
+    def parse_rule(args: list[str]) -> tuple[str, str, str, str]:
+        """
+        Parse "<city> <field> <operator> <value>"
+
+        Args:
+            args: Command arguments, the city may span several of them
+
+        Returns:
+            Tuple of (city, field, operator, threshold)
+
+        Raises:
+            ValueError: If the rule is malformed
+        """
+        if len(args) < 4:
+            raise ValueError("Expected <city> <field> <operator> <value>")
+        city = ' '.join(args[:-3])
+        field, op, threshold = (arg.lower() for arg in args[-3:])
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field: {field}")
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator: {op}")
+        if field == 'condition':
+            if op != '=':
+                raise ValueError("Conditions can only be compared with =")
+        elif not math.isfinite(float(threshold)):
+            raise ValueError(f"Not a number: {threshold}")
+        else:
+            threshold = f"{float(threshold):g}"
+        return city, field, op, threshold
+
+    @staticmethod
+    def holds(rule: AlertRule, value: Any) -> bool:
+        """Whether a field value satisfies a rule"""
+        threshold = rule.threshold if rule.field == 'condition' else float(rule.threshold)
+        return OPERATORS[rule.operator](value, threshold)
+
+    def _index(self, rule: AlertRule) -> None:
+        self._rules.setdefault(rule.city_key, {}).setdefault(rule.field, {})[rule.id] = rule
+        self._by_chat.setdefault(rule.chat_id, {})[rule.id] = rule
+        self._cities.setdefault(rule.city_key, rule.city)
+
+    def _unindex(self, rule: AlertRule) -> None:
+        fields = self._rules.get(rule.city_key, {})
+        fields.get(rule.field, {}).pop(rule.id, None)
+        if not fields.get(rule.field):
+            fields.pop(rule.field, None)
+        if not fields:
+            # Nobody watches the city anymore
+            self._rules.pop(rule.city_key, None)
+            self._cities.pop(rule.city_key, None)
+            self._snapshots.pop(rule.city_key, None)
+            self._unchecked.pop(rule.city_key, None)
+        rules = self._by_chat.get(rule.chat_id, {})
+        rules.pop(rule.id, None)
+        if not rules:
+            self._by_chat.pop(rule.chat_id, None)
+
+    def rules_for_chat(self, chat_id: int) -> list[AlertRule]:
+        """Get rules of a chat, oldest first"""
+        return sorted(self._by_chat.get(chat_id, {}).values(), key=lambda rule: rule.id)
+
+    async def add_rule(
+            self,
+            chat_id: int,
+            user_id: Optional[int],
+            city_name: str,
+            field: str,
+            op: str,
+            threshold: str
+    ) -> AlertRule:
+        """
+        Watch a field of a city for a chat
+
+        Args:
+            chat_id: Chat receiving the alerts
+            user_id: User who created the rule
+            city_name: City as typed by the user
+            field: Field from FIELDS
+            op: Operator from OPERATORS
+            threshold: Value to compare with, as returned by parse_rule
+
+        Returns:
+            Stored rule
+
+        Raises:
+            ValueError: If the city is unknown
+        """
+        # Validates the city (and warms the cache the next refresh reads)
+        await self.weather_api.get_current_weather_async(city_name)
+        rule = await self.store.add(AlertRule(
+            id=None,
+            chat_id=chat_id,
+            user_id=user_id,
+            city=city_name,
+            city_key=normalize_city_name(city_name),
+            field=field,
+            operator=op,
+            threshold=threshold
+        ))
+        if rule.id not in self._by_chat.get(chat_id, {}):
+            self._index(rule)
+            # Checked on the next refresh even if the field doesn't change
+            self._unchecked.setdefault(rule.city_key, set()).add(rule.field)
+        return rule
+
+    async def remove_rules(self, chat_id: int, rule_id: Optional[int] = None) -> int:
+        """Remove a rule of a chat, or all of them; returns the number removed"""
+        removed = await self.store.remove(chat_id, rule_id)
+        for removed_id in removed:
+            rule = self._by_chat.get(chat_id, {}).get(removed_id)
+            if rule is not None:
+                self._unindex(rule)
+        return len(removed)
+
+    async def start(self, send: Callable[[int, str], Awaitable[Any]]) -> None:
+        """
+        Load the rules of this worker's chats and start refreshing
+
+        Args:
+            send: Coroutine function sending a text to a chat id
+        """
+        self._send = send
+        # Under the supervisor the other workers watch the other chats; a chat's
+        # /alert and /unalert always reach the worker that watches it
+        for rule in await self.store.all(self.config.workers, self.config.worker_index):
+            self._index(rule)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop refreshing and close the store"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.store.close)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logEvent(e, self.refresh)
+            await asyncio.sleep(self.config.refresh_interval)
+
+    async def refresh(self) -> int:
+        """
+        Fetch every watched city and notify the rules that started to hold
+
+        Returns:
+            Number of alerts raised
+        """
+        if not self._cities:
+            return 0
+
+        started = time.perf_counter()
+        # Not the stale-while-revalidate copy: thresholds are checked on current data
+        results = await self.weather_api.get_current_weather_many_async(
+            list(self._cities.values()), max_age=self.config.max_observation_age
+        )
+
+        alerts: Dict[int, list[str]] = {}
+        state_changes: list[tuple[int, bool]] = []
+        for city_name, result in results.items():
+            if isinstance(result, Exception):
+                self.fetch_failures += 1
+                continue
+
+            city_key = normalize_city_name(city_name)
+            fields = self._rules.get(city_key)
+            if not fields:
+                # Last rule of the city was removed during the fetch
+                continue
+            values = {field: FIELDS[field](result) for field in fields}
+            previous = self._snapshots.get(city_key, {})
+            changed = {field for field, value in values.items() if previous.get(field, _UNSEEN) != value}
+            changed |= self._unchecked.pop(city_key, set())
+            self._snapshots[city_key] = values
+            if changed:
+                self.cities_changed += 1
+
+            for field in changed:
+                value = values.get(field)
+                if value is None:
+                    continue
+                for rule in fields.get(field, {}).values():
+                    self.evaluations += 1
+                    triggered = self.holds(rule, value)
+                    if triggered == rule.active:
+                        continue
+                    rule.active = triggered
+                    state_changes.append((rule.id, triggered))
+                    if triggered:
+                        alerts.setdefault(rule.chat_id, []).append(f"{rule.describe()} (now {value})")
+
+        if state_changes:
+            await self.store.set_active(state_changes)
+        if alerts:
+            await self.sender.send_all(self._send, {
+                chat_id: self.config.message_template.format(alerts='\n'.join(chat_alerts))
+                for chat_id, chat_alerts in alerts.items()
+            })
+
+        self.refreshes += 1
+        self.last_refresh_ms = (time.perf_counter() - started) * 1000
+        return sum(len(chat_alerts) for chat_alerts in alerts.values())
+
+    def stats(self) -> Dict[str, Any]:
+        """Get rule and refresh counters"""
+        return {
+            'rules': sum(len(rules) for rules in self._by_chat.values()),
+            'cities': len(self._cities),
+            'refreshes': self.refreshes,
+            'cities_changed': self.cities_changed,
+            'evaluations': self.evaluations,
+            'fetch_failures': self.fetch_failures,
+            'alerts_sent': self.sender.sent,
+            'send_failures': self.sender.failures,
+            'last_refresh_ms': self.last_refresh_ms
+        }
@@ -1,5 +1,11 @@
-from typing import Optional
+import asyncio
+import re
+from functools import lru_cache
+from typing import Optional, Any, Awaitable, Union
+
+import pytz
 from telegram import Update
+from telegram.error import TelegramError
 from telegram.ext import (
     Application,
     CommandHandler,
@@ -11,10 +17,41 @@ from telegram.ext import (
 from utils.ErrorLogger import logEvent
 from utils.UserRequest import UserRequestLogger
 from services.WeatherService import OpenWeatherMapAPI
+from services.TimeZoneService import TimezoneService
+from services.DigestScheduler import DigestScheduler
+from services.AlertEngine import AlertEngine
 from utils.ApiUtils import APIService
+from utils.HttpClient import AsyncHttpClient
+from utils.SingleFlight import SingleFlight
+from utils.CityStore import CityStore
+from utils.ImagePool import ImagePrefetchPool
+from utils.TelegramFileCache import TelegramFileCache
+from utils.UpdateProcessor import ChatOrderedUpdateProcessor
+from utils.QuotaManager import QuotaManager
+from utils.Cache import normalize_city_name
 from utils.KeyManagerUtils import KeyManager
 from models.BotConfig import BotConfig
 
+# Marker for a reply section that did not finish within its budget
+_TIMED_OUT = object()
+
+# Delivery time of a digest subscription, HH:MM
+_LOCAL_TIME = re.compile(r'^([01]?\d|2[0-3]):([0-5]\d)$')
+
+# Unambiguous separators between cities of a multi-city message; commas may
+# also be part of one place name ("St. Petersburg, Russia")
+_CITY_SEPARATORS = re.compile(r'[;\n]')
+# "Paris, FR", "Portland, OR" or "Washington, D.C.": a country or state code, not another city
+_REGION_CODE = re.compile(r'^(?:[A-Za-z]{2}|(?:[A-Za-z]\.){2,3})$')
+
+
+@lru_cache(maxsize=1)
+def _country_names() -> frozenset[str]:
+    """Lowercase country names that qualify the city before them ("Paris, France")"""
+    return frozenset(
+        name.lower() for name in (*pytz.country_names.values(), 'United Kingdom', 'USA')
+    )
+
 
 class WeatherBot:
     """Modern implementation of Weather Bot using python-telegram-bot"""
@@ -24,13 +61,43 @@ class WeatherBot:
             config: Optional[BotConfig] = None,
             weather_api: Optional[OpenWeatherMapAPI] = None,
             api_service: Optional[APIService] = None,
-            key_manager: Optional[KeyManager] = None
+            key_manager: Optional[KeyManager] = None,
+            http_client: Optional[AsyncHttpClient] = None
     ):
         """Initialize bot with its dependencies"""
         self.config = config or BotConfig()
-        self.weather_api = weather_api or OpenWeatherMapAPI()
-        self.api_service = api_service or APIService()
         self.key_manager = key_manager or KeyManager()
+        # One pooled client shared by every upstream call made from the handlers
+        self.http_client = http_client or AsyncHttpClient()
+        # Concurrent chats asking for the same city share in-flight upstream calls
+        self.single_flight = SingleFlight()
+        # Survives restarts, opened lazily on the first lookup
+        self.city_store = CityStore()
+        # Free tier budgets shared by all chats, weather first when they run low
+        self.quota = QuotaManager()
+        self.api_service = api_service or APIService(
+            http_client=self.http_client,
+            single_flight=self.single_flight,
+            store=self.city_store,
+            quota=self.quota
+        )
+        self.weather_api = weather_api or OpenWeatherMapAPI(
+            key_manager=self.key_manager,
+            timezone_service=TimezoneService(api_service=self.api_service, store=self.city_store),
+            http_client=self.http_client,
+            single_flight=self.single_flight,
+            quota=self.quota
+        )
+        # Refilled in the background once the application is running
+        self.image_pool = ImagePrefetchPool(self.api_service.image_api)
+        # Images uploaded once are resent by Telegram file_id
+        self.file_cache = TelegramFileCache()
+        # Daily digests, delivered by a scheduler task once the application runs
+        self.digest_scheduler = DigestScheduler(self.weather_api)
+        # Threshold alerts, refreshed in batches once the application runs
+        self.alert_engine = AlertEngine(self.weather_api)
+        # Chats are served in parallel, each chat's messages still in order
+        self.update_processor = ChatOrderedUpdateProcessor()
         self.token = self.key_manager.get_key(self.config.telegram_key_path)
         self.user_logger = UserRequestLogger()
 
@@ -46,58 +113,372 @@ class WeatherBot:
         """Handle stop command"""
         await update.message.reply_text(self.config.messages['stop'])
 
+    async def subscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /subscribe <city> <HH:MM> command"""
+        match = _LOCAL_TIME.match(context.args[-1]) if len(context.args) >= 2 else None
+        if match is None:
+            await update.message.reply_text(self.config.messages['subscribe_usage'])
+            return
+
+        local_time = f"{int(match.group(1)):02d}:{match.group(2)}"
+        city = ' '.join(context.args[:-1])
+        chat_id = update.effective_chat.id
+        subscriptions = await self.digest_scheduler.store.for_chat(chat_id)
+        if len(subscriptions) >= self.digest_scheduler.config.max_per_chat and all(
+                subscription.city_key != normalize_city_name(city) for subscription in subscriptions
+        ):
+            await update.message.reply_text(
+                self.config.messages['subscribe_limit'].format(count=self.digest_scheduler.config.max_per_chat)
+            )
+            return
+
+        try:
+            subscription = await self.digest_scheduler.subscribe(
+                chat_id, update.effective_user.id, city, local_time
+            )
+        except Exception as e:
+            await update.message.reply_text(self.weather_api.error_message(e))
+            return
+        await update.message.reply_text(self.config.messages['subscribed'].format(
+            city=subscription.city, time=subscription.local_time
+        ))
+
+    async def unsubscribe(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /unsubscribe [city] command (all cities without an argument)"""
+        city_key = normalize_city_name(' '.join(context.args)) if context.args else None
+        removed = await self.digest_scheduler.store.remove(update.effective_chat.id, city_key)
+        await update.message.reply_text(self.config.messages['unsubscribed'].format(count=removed))
+
+    async def subscriptions(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /subscriptions command"""
+        subscriptions = await self.digest_scheduler.store.for_chat(update.effective_chat.id)
+        if not subscriptions:
+            await update.message.reply_text(self.config.messages['no_subscriptions'])
+            return
+        await update.message.reply_text(self.config.messages['subscriptions'].format(subscriptions='\n'.join(
+            f"• {subscription.city} at {subscription.local_time}" for subscription in subscriptions
+        )))
+
+    async def alert(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /alert <city> <field> <operator> <value> command"""
+        try:
+            city, field, op, threshold = self.alert_engine.parse_rule(context.args)
+        except ValueError:
+            await update.message.reply_text(self.config.messages['alert_usage'])
+            return
+
+        chat_id = update.effective_chat.id
+        if len(self.alert_engine.rules_for_chat(chat_id)) >= self.alert_engine.config.max_per_chat:
+            await update.message.reply_text(
+                self.config.messages['alert_limit'].format(count=self.alert_engine.config.max_per_chat)
+            )
+            return
+
+        try:
+            rule = await self.alert_engine.add_rule(chat_id, update.effective_user.id, city, field, op, threshold)
+        except Exception as e:
+            await update.message.reply_text(self.weather_api.error_message(e))
+            return
+        await update.message.reply_text(self.config.messages['alert_added'].format(id=rule.id, rule=rule.describe()))
+
+    async def alerts(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /alerts command"""
+        rules = self.alert_engine.rules_for_chat(update.effective_chat.id)
+        if not rules:
+            await update.message.reply_text(self.config.messages['no_alerts'])
+            return
+        await update.message.reply_text(self.config.messages['alerts'].format(alerts='\n'.join(
+            f"#{rule.id} {rule.describe()}" for rule in rules
+        )))
+
+    async def unalert(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /unalert [id] command (all alerts without an argument)"""
+        rule_id = context.args[0].lstrip('#') if context.args else None
+        if rule_id is not None and not rule_id.isdigit():
+            await update.message.reply_text(self.config.messages['alert_usage'])
+            return
+        removed = await self.alert_engine.remove_rules(
+            update.effective_chat.id, int(rule_id) if rule_id is not None else None
+        )
+        await update.message.reply_text(self.config.messages['alerts_removed'].format(count=removed))
+
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """Handle /stats command (admins only): quota usage, rejections, cache and queue metrics"""
+        if update.effective_user is None or update.effective_user.id not in self.config.admin_user_ids:
+            return
+
+        sections = {
+            'Quota': self.quota.stats(),
+            'Upstreams': self.http_client.stats(),
+            'Weather': self.weather_api.stats(),
+            'Single flight': self.single_flight.stats(),
+            'City cache': self.api_service.city_api.cache.stats(),
+            'File cache': self.file_cache.stats(),
+            'Digests': self.digest_scheduler.stats(),
+            'Alerts': self.alert_engine.stats(),
+            'Updates': self.update_processor.stats(),
+            'Image pool': self.image_pool.stats(),
+            'Historical events': self.api_service.historical_api.stats()
+        }
+        await update.message.reply_text('\n'.join(self._format_stats(sections)))
+
+    @classmethod
+    def _format_stats(cls, values: dict, indent: int = 0) -> list[str]:
+        """Render nested stats dictionaries as indented lines"""
+        lines = []
+        for name, value in values.items():
+            if isinstance(value, dict):
+                lines.append(f"{'  ' * indent}{name}:")
+                lines.extend(cls._format_stats(value, indent + 1))
+            else:
+                lines.append(f"{'  ' * indent}{name}: {round(value, 1) if isinstance(value, float) else value}")
+        return lines
+
+    async def _with_budget(self, section: str, coroutine: Awaitable[Any], deadline: float) -> Any:
+        """
+        Await a reply section within its own budget and the overall deadline
+
+        Args:
+            section: Section name (key of config.section_timeouts)
+            coroutine: Coroutine producing the section content
+            deadline: Event loop time by which the whole reply is due
+
+        Returns:
+            Section result or _TIMED_OUT if the budget ran out
+        """
+        loop = asyncio.get_running_loop()
+        budget = min(self.config.section_timeouts[section], deadline - loop.time())
+        try:
+            return await asyncio.wait_for(coroutine, timeout=max(budget, 0))
+        except asyncio.TimeoutError:
+            return _TIMED_OUT
+
+    async def _next_image(self) -> Optional[Union[bytes, str]]:
+        """
+        Get image for the reply at the lowest cost available
+
+        Returns:
+            Prefetched image bytes, a catalogued Telegram file_id, freshly
+            downloaded bytes (in this order of preference) or None
+        """
+        if (image := self.image_pool.pop()) is not None:
+            return image
+        if self.file_cache.config.catalog_fallback:
+            if file_id := await self.file_cache.random_file_id():
+                return file_id
+        return await self.api_service.get_random_image_async()
+
+    async def _send_image(self, update: Update, image: Union[bytes, str]) -> None:
+        """Send image, reusing the Telegram file_id of identical uploads"""
+        file_id = image if isinstance(image, str) else await self.file_cache.lookup(image)
+        if file_id is not None:
+            try:
+                await update.message.reply_photo(photo=file_id)
+                return
+            except TelegramError as e:
+                logEvent(e, self._send_image, user_input=file_id)
+                await self.file_cache.forget(file_id)
+                if isinstance(image, str):
+                    return
+
+        message = await update.message.reply_photo(photo=image)
+        if message.photo:
+            await self.file_cache.remember(image, message.photo[-1].file_id)
+
+    @staticmethod
+    def _split_cities(text: str) -> list[str]:
+        """
+        Split a message into the cities it names
+
+        Semicolons and new lines always separate cities, commas too unless
+        what follows is a region code or a country name, which stays attached
+        to the city before it in the q=city,country form OpenWeatherMap
+        understands: "London, Paris, Tokyo" is three cities, "St. Petersburg,
+        Russia" and "Portland, OR" one each.
+
+        Args:
+            text: Message text
+
+        Returns:
+            City names in message order (one element for a single city)
+        """
+        cities: list[str] = []
+        for chunk in _CITY_SEPARATORS.split(text):
+            chunk_cities: list[str] = []
+            for part in (part.strip() for part in chunk.split(',')):
+                if not part:
+                    continue
+                if chunk_cities and (_REGION_CODE.match(part) or part.lower() in _country_names()):
+                    chunk_cities[-1] = f"{chunk_cities[-1]},{part}"
+                else:
+                    chunk_cities.append(part)
+            cities.extend(chunk_cities)
+        return cities if len(cities) > 1 else [text]
+
+    async def _format_many_weather(self, cities: list[str]) -> str:
+        """Weather reports for several cities, one paragraph each"""
+        return '\n\n'.join(await self.weather_api.get_formatted_weather_many_async(cities))
+
     async def handle_city(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """Handle city messages"""
         self.user_logger.log_request(update)
+        if not self.quota.allow_user(update.effective_user.id):
+            await update.message.reply_text(self.config.messages['rate_limited'])
+            return
+
         try:
             city = update.message.text
-
-            if city.lower() in self.config.preserved_words:
+            names = [city, *(name.strip() for name in re.split(r'[,;\n]', city))]
+            if any(name.lower() in self.config.preserved_words for name in names):
                 await update.message.reply_text(self.config.messages['preserved_word'])
                 return
 
-            # Get all required information
-            weather_info = self.weather_api.get_formatted_weather(city)
-            population_info = self.api_service.get_city_population_info(city)
-            random_event = self.api_service.get_random_event()
+            cities = self._split_cities(city)
+            deadline = asyncio.get_running_loop().time() + self.config.response_deadline
+
+            # Fetch all sections concurrently, each within its own budget
+            image_task = asyncio.create_task(
+                self._with_budget('image', self._next_image(), deadline)
+            )
+            if len(cities) > 1:
+                # One combined reply, weather for all cities fetched as a batch
+                template = 'multi_response_template'
+                sections = {
+                    'weather': self._format_many_weather(cities[:self.config.max_cities]),
+                    'event': self.api_service.get_random_event_async()
+                }
+            else:
+                template = 'response_template'
+                sections = {
+                    'weather': self.weather_api.get_formatted_weather_async(city),
+                    'population': self.api_service.get_city_population_info_async(city),
+                    'event': self.api_service.get_random_event_async()
+                }
+            try:
+                results = dict(zip(sections, await asyncio.gather(*(
+                    self._with_budget(name, coroutine, deadline)
+                    for name, coroutine in sections.items()
+                ))))
+            except BaseException:
+                image_task.cancel()
+                raise
+
+            # Degrade slow sections to their fallback text
+            dropped = [name for name, result in results.items() if result is _TIMED_OUT]
+            for name in dropped:
+                results[name] = self.config.messages[f'{name}_timeout']
 
             # Format response using template
-            combined_reply = self.config.messages['response_template'].format(
-                weather_info=weather_info,
-                population_info=population_info,
-                random_event=random_event
+            combined_reply = self.config.messages[template].format(
+                weather_info=results['weather'],
+                population_info=results.get('population'),
+                random_event=results['event']
             )
+            if len(cities) > self.config.max_cities:
+                combined_reply += self.config.messages['too_many_cities'].format(count=self.config.max_cities)
+            if dropped:
+                combined_reply += self.config.messages['timing_note'].format(sections=', '.join(dropped))
 
             # Send text response
             await update.message.reply_text(combined_reply)
 
-            # Get and send random image
-            if image_data := self.api_service.get_random_image():
-                await update.message.reply_photo(photo=image_data)
+            # Send random image once it arrives
+            image_data = await image_task
+            if image_data is _TIMED_OUT:
+                await update.message.reply_text(self.config.messages['image_timeout'])
+            elif image_data:
+                await self._send_image(update, image_data)
 
         except Exception as e:
             await update.message.reply_text(self.config.messages['error'])
             logEvent(e.__cause__, self.handle_city, user_input=update.message.text)
 
+    async def _on_startup(self, application: Application) -> None:
+        """Warm up lazily loaded dependencies and start background tasks without delaying startup"""
+        application.create_task(
+            asyncio.to_thread(lambda: self.weather_api.timezone_service.timezone_finder)
+        )
+        self.image_pool.start()
+        self.api_service.historical_api.start_prefetch()
+        self.digest_scheduler.start(
+            lambda chat_id, text: application.bot.send_message(chat_id=chat_id, text=text)
+        )
+        await self.alert_engine.start(
+            lambda chat_id, text: application.bot.send_message(chat_id=chat_id, text=text)
+        )
+
+    async def _on_shutdown(self, application: Application) -> None:
+        """Stop background tasks, release pooled upstream connections and flush stores"""
+        await self.image_pool.stop()
+        await self.api_service.historical_api.stop_prefetch()
+        await self.digest_scheduler.stop()
+        await self.alert_engine.stop()
+        await self.http_client.aclose()
+        await asyncio.to_thread(self.city_store.close)
+        self.file_cache.close()
+
+    def build_application(self, updater: bool = True) -> Application:
+        """
+        Build application with all handlers registered
+
+        Args:
+            updater: False for an application fed updates by someone else
+                (e.g. a supervisor process), which then never polls Telegram
+
+        Returns:
+            Application ready to be run or initialized
+        """
+        builder = (
+            Application.builder()
+            .token(self.token)
+            .concurrent_updates(self.update_processor)
+            .post_init(self._on_startup)
+            .post_shutdown(self._on_shutdown)
+        )
+        if self.config.telegram_base_url:
+            builder = builder.base_url(self.config.telegram_base_url)
+        if not updater:
+            builder = builder.updater(None)
+        application = builder.build()
+
+        # Add handlers
+        application.add_handler(CommandHandler("start", self.start))
+        application.add_handler(CommandHandler("help", self.help))
+        application.add_handler(CommandHandler("stop", self.stop))
+        application.add_handler(CommandHandler("subscribe", self.subscribe))
+        application.add_handler(CommandHandler("unsubscribe", self.unsubscribe))
+        application.add_handler(CommandHandler("subscriptions", self.subscriptions))
+        application.add_handler(CommandHandler("alert", self.alert))
+        application.add_handler(CommandHandler("alerts", self.alerts))
+        application.add_handler(CommandHandler("unalert", self.unalert))
+        application.add_handler(CommandHandler("stats", self.stats))
+
+        # Handle all non-command messages as city names
+        application.add_handler(
+            MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_city)
+        )
+        return application
+
     def run(self) -> None:
         """Run the bot"""
         try:
-            # Create application
-            application = Application.builder().token(self.token).build()
-
-            # Add handlers
-            application.add_handler(CommandHandler("start", self.start))
-            application.add_handler(CommandHandler("help", self.help))
-            application.add_handler(CommandHandler("stop", self.stop))
-
-            # Handle all non-command messages as city names
-            application.add_handler(
-                MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_city)
-            )
+            application = self.build_application()
 
             # Start the bot
-            print("Starting Weather Assistant Bot...")
-            application.run_polling()
+            if self.config.use_webhook:
+                print(f"Starting Weather Assistant Bot (webhook on "
+                      f"{self.config.webhook_listen}:{self.config.webhook_port})...")
+                application.run_webhook(
+                    listen=self.config.webhook_listen,
+                    port=self.config.webhook_port,
+                    url_path=self.config.webhook_path,
+                    webhook_url=self.config.webhook_endpoint,
+                    secret_token=self.config.webhook_secret,
+                    max_connections=self.config.webhook_max_connections
+                )
+            else:
+                print("Starting Weather Assistant Bot...")
+                application.run_polling()
 
         except Exception as e:
             print(f"Error starting bot: {e}")
@@ -0,0 +1,215 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone as fixed_timezone, tzinfo
+from typing import Any, Awaitable, Callable, Dict, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from models.DigestConfig import DigestConfig
+from services.WeatherService import OpenWeatherMapAPI
+from utils.Cache import normalize_city_name
+from utils.ErrorLogger import logEvent
+from utils.PacedSender import PacedSender
+from utils.SubscriptionStore import Subscription, SubscriptionStore
+
+
+class DigestScheduler:
+    """
+    Delivers daily weather digests to subscribed chats
+
+    One background task wakes up every tick and reads the subscriptions due
+    from the store (indexed by next delivery time). Weather for every distinct
+    city among them is fetched once as a batch and fanned out to all their
+    subscribers, one message per chat, at a rate Telegram accepts. Delivery
+    times are kept in UTC and recomputed from the subscriber's local time,
+    so daylight saving changes are followed.
+    """
+
+    def __init__(
+            self,
+            weather_api: OpenWeatherMapAPI,
+            store: Optional[SubscriptionStore] = None,
+            config: Optional[DigestConfig] = None
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            weather_api: Weather API used for the batched fetches (and its timezone service)
+            store: Subscription store
+            config: Tick, batch and send rate settings
+        """
+        self.config = config or DigestConfig()
+        self.weather_api = weather_api
+        self.store = store or SubscriptionStore(self.config)
+        # Chats that blocked the bot lose their subscriptions
+        self.sender = PacedSender(
+            self.config.messages_per_second, self.config.max_concurrent_sends, self.store.remove
+        )
+        self._send: Optional[Callable[[int, str], Awaitable[Any]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.cities_fetched = 0
+        self.last_round_ms = 0.0
+
+    @staticmethod
+    def _zone(timezone: str) -> tzinfo:
+        """Timezone of a subscription: IANA name or fixed UTC offset in seconds"""
+        try:
+            return ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            return fixed_timezone(timedelta(seconds=int(timezone)))
+
+    @classmethod
+    def next_run(cls, local_time: str, timezone: str, after: float) -> float:
+        """
+        Next delivery time strictly after a moment
+
+        Args:
+            local_time: HH:MM in the subscriber's city
+            timezone: IANA name or UTC offset in seconds
+            after: Unix time the delivery must follow
+
+        Returns:
+            Unix time of the next delivery
+        """
+        zone = cls._zone(timezone)
+        hour, minute = map(int, local_time.split(':'))
+        now = datetime.fromtimestamp(after, tz=zone)
+        run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if run.timestamp() <= after:
+            # Same wall clock time on the next local day
+            run = (now + timedelta(days=1)).replace(hour=hour, minute=minute, second=0, microsecond=0)
+        return run.timestamp()
+
+    async def subscribe(
+            self,
+            chat_id: int,
+            user_id: Optional[int],
+            city_name: str,
+            local_time: str
+    ) -> Subscription:
+        """
+        Subscribe a chat to the daily digest of a city
+
+        Args:
+            chat_id: Chat receiving the digest
+            user_id: User who subscribed
+            city_name: City as typed by the user
+            local_time: Delivery time, HH:MM in the city's timezone
+
+        Returns:
+            Stored subscription
+
+        Raises:
+            ValueError: If the city is unknown
+        """
+        # Validates the city and gives its coordinates for the timezone lookup
+        weather_data = await self.weather_api.get_current_weather_async(city_name)
+        timezone = None
+        if weather_data.latitude is not None and weather_data.longitude is not None:
+            timezone = await asyncio.to_thread(
+                self.weather_api.timezone_service.get_timezone_at,
+                weather_data.latitude,
+                weather_data.longitude
+            )
+        if timezone is None:
+            timezone = str(weather_data.utc_offset or 0)
+
+        subscription = Subscription(
+            id=None,
+            chat_id=chat_id,
+            user_id=user_id,
+            city=city_name,
+            city_key=normalize_city_name(city_name),
+            local_time=local_time,
+            timezone=timezone,
+            next_run_utc=self.next_run(local_time, timezone, time.time())
+        )
+        await self.store.add(subscription)
+        return subscription
+
+    def start(self, send: Callable[[int, str], Awaitable[Any]]) -> None:
+        """
+        Start delivering digests (needs a running event loop)
+
+        Args:
+            send: Coroutine function sending a text to a chat id
+        """
+        self._send = send
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the scheduler and close the store"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.store.close)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_due()
+            except Exception as e:
+                logEvent(e, self.run_due)
+            await asyncio.sleep(self.config.tick_seconds)
+
+    async def run_due(self, now: Optional[float] = None) -> int:
+        """
+        Deliver every digest due at a moment
+
+        Args:
+            now: Unix time to deliver for (default: current time)
+
+        Returns:
+            Number of digests sent
+        """
+        now = time.time() if now is None else now
+        started = time.perf_counter()
+        sent_before = self.sender.sent
+        # Claiming moves them forward before sending: a crash skips a digest rather than
+        # repeating it, and processes sharing the store never claim the same one
+        while due := await self.store.claim_due(
+                now,
+                self.config.batch_size,
+                lambda subscription: self.next_run(subscription.local_time, subscription.timezone, now)
+        ):
+            cities: Dict[str, str] = {}
+            for subscription in due:
+                cities.setdefault(subscription.city_key, subscription.city)
+            reports = await self._city_reports(list(cities.values()))
+            self.cities_fetched += len(cities)
+
+            messages: Dict[int, list[str]] = {}
+            for subscription in due:
+                messages.setdefault(subscription.chat_id, []).append(reports[subscription.city_key])
+            await self.sender.send_all(self._send, {
+                chat_id: self.config.message_template.format(reports='\n\n'.join(chat_reports))
+                for chat_id, chat_reports in messages.items()
+            })
+
+        self.rounds += 1
+        self.last_round_ms = (time.perf_counter() - started) * 1000
+        return self.sender.sent - sent_before
+
+    async def _city_reports(self, city_names: list[str]) -> Dict[str, str]:
+        """Formatted weather per normalized city name, fetched as one batch"""
+        reports = {}
+        for city_name, result in (await self.weather_api.get_current_weather_many_async(city_names)).items():
+            if isinstance(result, Exception):
+                report = f"{city_name}: {self.weather_api.error_message(result)}"
+            else:
+                report = await self.weather_api.format_weather_response_async(result)
+            reports[normalize_city_name(city_name)] = report
+        return reports
+
+    def stats(self) -> Dict[str, Any]:
+        """Get delivery counters"""
+        return {
+            'rounds': self.rounds,
+            'cities_fetched': self.cities_fetched,
+            'digests_sent': self.sender.sent,
+            'send_failures': self.sender.failures,
+            'last_round_ms': self.last_round_ms
+        }
@@ -1,10 +1,17 @@
-from datetime import datetime
-from typing import Optional, Tuple
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone as fixed_timezone
+from functools import lru_cache
+from typing import Optional, Tuple, TYPE_CHECKING
 from zoneinfo import ZoneInfo
 
-from timezonefinder import TimezoneFinder
+if TYPE_CHECKING:
+    from timezonefinder import TimezoneFinder
 
 from utils.ApiUtils import APIService
+from utils.HttpClient import run_sync
+from utils.Cache import TTLCache
+from utils.CityStore import CityStore
 from models.TimezoneConfig import TimezoneConfig
 
 
@@ -14,7 +21,8 @@ class TimezoneService:
     def __init__(
             self,
             config: Optional[TimezoneConfig] = None,
-            api_service: Optional[APIService] = None
+            api_service: Optional[APIService] = None,
+            store: Optional[CityStore] = None
     ):
         """
         Initialize timezone service
@@ -22,12 +30,27 @@ class TimezoneService:
         Args:
             config: Configuration for timezone handling
             api_service: Service for API calls (coordinates lookup)
+            store: Optional persistent store for resolved timezones
         """
         self.config = config or TimezoneConfig()
         self.api_service = api_service or APIService()
-        self.timezone_finder = TimezoneFinder()
-
-    def get_coordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
+        self.store = store
+        self._timezone_finder: Optional['TimezoneFinder'] = None
+        # The startup warm-up and lookups in worker threads may race to load it
+        self._timezone_finder_lock = threading.Lock()
+        self._timezones = TTLCache(self.config.cache_size, self.config.cache_ttl)
+
+    @property
+    def timezone_finder(self) -> 'TimezoneFinder':
+        """Timezone polygon finder, imported and loaded on first use"""
+        if self._timezone_finder is None:
+            with self._timezone_finder_lock:
+                if self._timezone_finder is None:
+                    from timezonefinder import TimezoneFinder
+                    self._timezone_finder = TimezoneFinder()
+        return self._timezone_finder
+
+    async def get_coordinates_async(self, city_name: str) -> Optional[Tuple[float, float]]:
         """
         Get coordinates for a city
 
@@ -37,12 +60,16 @@ class TimezoneService:
         Returns:
             Tuple of (latitude, longitude) or None if not found
         """
-        lat, lng = self.api_service.get_city_coordinates(city_name)
+        lat, lng = await self.api_service.get_city_coordinates_async(city_name)
         if lat is None or lng is None:
             return None
         return lat, lng
 
-    def get_timezone(self, city_name: str) -> Optional[str]:
+    def get_coordinates(self, city_name: str) -> Optional[Tuple[float, float]]:
+        """Get coordinates for a city (sync wrapper)"""
+        return run_sync(self.get_coordinates_async(city_name))
+
+    async def get_timezone_async(self, city_name: str) -> Optional[str]:
         """
         Get timezone for a city
 
@@ -52,31 +79,68 @@ class TimezoneService:
         Returns:
             Timezone string or None if not found
         """
-        coordinates = self.get_coordinates(city_name)
+        coordinates = await self.get_coordinates_async(city_name)
         if not coordinates:
             return None
 
         lat, lng = coordinates
-        return self.timezone_finder.timezone_at(lat=lat, lng=lng)
+        return await self.get_timezone_at_async(lat, lng)
 
-    def get_current_time(
-            self,
-            city_name: str,
-            time_format: Optional[str] = None
-    ) -> str:
+    def get_timezone(self, city_name: str) -> Optional[str]:
+        """Get timezone for a city (sync wrapper)"""
+        return run_sync(self.get_timezone_async(city_name))
+
+    def _coordinates_key(self, latitude: float, longitude: float) -> str:
+        return f"{latitude:.{self.config.coordinate_precision}f},{longitude:.{self.config.coordinate_precision}f}"
+
+    async def get_timezone_at_async(self, latitude: float, longitude: float) -> Optional[str]:
         """
-        Get current time for a city
+        Get timezone for coordinates without blocking the event loop
+
+        Memory hits are answered right away; the store read and the polygon
+        lookup behind a miss run in a thread.
 
         Args:
-            city_name: Name of the city
-            time_format: Optional custom time format
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
 
         Returns:
-            Formatted time string
+            Timezone string or None if not found
         """
-        format_str = time_format or self.config.default_time_format
-        timezone_str = self.get_timezone(city_name)
+        if (timezone_str := self._timezones.get(self._coordinates_key(latitude, longitude))) is not None:
+            return timezone_str
+        return await asyncio.to_thread(self.get_timezone_at, latitude, longitude)
+
+    def get_timezone_at(self, latitude: float, longitude: float) -> Optional[str]:
+        """
+        Get timezone for coordinates without any network lookup
+
+        Args:
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+
+        Returns:
+            Timezone string or None if not found
+        """
+        key = self._coordinates_key(latitude, longitude)
+        if (timezone_str := self._timezones.get(key)) is not None:
+            return timezone_str
 
+        if self.store is not None:
+            timezone_str = self.store.get_timezone(key)
+
+        if timezone_str is None:
+            timezone_str = self.timezone_finder.timezone_at(lat=latitude, lng=longitude)
+            if timezone_str is None:
+                return None
+            if self.store is not None:
+                self.store.put_timezone(key, timezone_str)
+
+        self._timezones.set(key, timezone_str)
+        return timezone_str
+
+    def _format_time(self, timezone_str: Optional[str], format_str: str) -> str:
+        """Format current time in given timezone, falling back to the default one"""
         try:
             if timezone_str:
                 timezone = ZoneInfo(timezone_str)
@@ -89,10 +153,101 @@ class TimezoneService:
             # Fallback to system time if there's any error
             return datetime.now().strftime(format_str)
 
+    async def get_current_time_async(
+            self,
+            city_name: str,
+            time_format: Optional[str] = None
+    ) -> str:
+        """
+        Get current time for a city
+
+        Args:
+            city_name: Name of the city
+            time_format: Optional custom time format
+
+        Returns:
+            Formatted time string
+        """
+        format_str = time_format or self.config.default_time_format
+        timezone_str = await self.get_timezone_async(city_name)
+        return self._format_time(timezone_str, format_str)
+
+    def get_current_time(
+            self,
+            city_name: str,
+            time_format: Optional[str] = None
+    ) -> str:
+        """Get current time for a city (sync wrapper)"""
+        return run_sync(self.get_current_time_async(city_name, time_format))
+
+    def get_current_time_at(
+            self,
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            utc_offset: Optional[int] = None,
+            time_format: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Get current time from already known coordinates or UTC offset
+
+        Coordinates give a named timezone (with DST rules); the offset alone
+        is used when coordinates are missing or can't be resolved.
+
+        Args:
+            latitude: Latitude in degrees
+            longitude: Longitude in degrees
+            utc_offset: Shift from UTC in seconds
+            time_format: Optional custom time format
+
+        Returns:
+            Formatted time string or None if neither is usable
+        """
+        timezone_str = None
+        if latitude is not None and longitude is not None:
+            timezone_str = self.get_timezone_at(latitude, longitude)
+        return self._format_time_at(timezone_str, utc_offset, time_format)
+
+    async def get_current_time_at_async(
+            self,
+            latitude: Optional[float] = None,
+            longitude: Optional[float] = None,
+            utc_offset: Optional[int] = None,
+            time_format: Optional[str] = None
+    ) -> Optional[str]:
+        """Get current time from already known coordinates or UTC offset (see get_current_time_at)"""
+        timezone_str = None
+        if latitude is not None and longitude is not None:
+            timezone_str = await self.get_timezone_at_async(latitude, longitude)
+        return self._format_time_at(timezone_str, utc_offset, time_format)
+
+    def _format_time_at(
+            self,
+            timezone_str: Optional[str],
+            utc_offset: Optional[int],
+            time_format: Optional[str]
+    ) -> Optional[str]:
+        """Format current time in a named timezone, else at a fixed offset"""
+        format_str = time_format or self.config.default_time_format
+
+        if timezone_str:
+            return self._format_time(timezone_str, format_str)
+
+        if utc_offset is not None:
+            offset = fixed_timezone(timedelta(seconds=utc_offset))
+            return datetime.now(tz=offset).strftime(format_str)
+
+        return None
+
+
+@lru_cache(maxsize=None)
+def _get_default_service() -> TimezoneService:
+    """Create default instance for backward compatibility on first use"""
+    return TimezoneService()
+
 
-# Create default instance for backward compatibility
-_default_service = TimezoneService()
-get_time_for_timezone = _default_service.get_current_time
+def get_time_for_timezone(city_name: str, time_format: Optional[str] = None) -> str:
+    """Backward compatible function for getting current time in a city"""
+    return _get_default_service().get_current_time(city_name, time_format)
 
 
 class TimezoneFormatter:
@@ -0,0 +1,97 @@
+import time
+from typing import Optional, Dict, Hashable, Tuple, TYPE_CHECKING
+
+from utils.Cache import TTLCache, normalize_city_name
+
+if TYPE_CHECKING:
+    from services.WeatherService import WeatherData
+
+
+class WeatherCache:
+    """
+    Cache of parsed weather observations with stale-while-revalidate
+
+    Observations are keyed by the canonical OpenWeatherMap city id once it is
+    known, so "london", "London " and "LONDON" share one entry. An entry is
+    fresh for ``fresh_ttl`` seconds and may then be served stale for another
+    ``stale_ttl`` seconds while a single background refresh runs.
+    """
+
+    def __init__(self, fresh_ttl: float = 600.0, stale_ttl: float = 600.0, max_size: int = 1000):
+        """
+        Initialize cache
+
+        Args:
+            fresh_ttl: Seconds an observation is served without refreshing
+            stale_ttl: Extra seconds a stale observation may be served while refreshing
+            max_size: Maximum number of cached cities
+        """
+        self.fresh_ttl = fresh_ttl
+        self._observations = TTLCache(max_size, fresh_ttl + stale_ttl)
+        # Normalized user input -> canonical city id
+        self._aliases = TTLCache(max_size * 4, 24 * 3600)
+        self._refreshing: set[Hashable] = set()
+        self.stale_hits = 0
+        self.refreshes = 0
+
+    def canonical_key(self, city_name: str) -> Hashable:
+        """Resolve user input to the canonical cache key (city id if known)"""
+        query = normalize_city_name(city_name)
+        return self._aliases.get(query, query)
+
+    def city_id(self, city_name: str) -> Optional[int]:
+        """OpenWeatherMap id of a city if it was resolved before, even if its observation expired"""
+        key = self.canonical_key(city_name)
+        return key if isinstance(key, int) else None
+
+    def lookup(self, city_name: str, max_age: Optional[float] = None) -> Tuple[Optional['WeatherData'], bool]:
+        """
+        Look up cached observation for a city
+
+        Args:
+            city_name: City name as typed by the user
+            max_age: Treat observations older than this many seconds as missing
+
+        Returns:
+            Tuple of (weather data or None, whether it is stale)
+        """
+        entry = self._observations.get(self.canonical_key(city_name))
+        if entry is None:
+            return None, False
+
+        fetched_at, weather_data = entry
+        age = time.monotonic() - fetched_at
+        if max_age is not None and age > max_age:
+            return None, False
+        is_stale = age > self.fresh_ttl
+        if is_stale:
+            self.stale_hits += 1
+        return weather_data, is_stale
+
+    def store(self, city_name: str, weather_data: 'WeatherData') -> None:
+        """Store a freshly fetched observation under the query that asked for it"""
+        key = weather_data.city_id if weather_data.city_id is not None else normalize_city_name(city_name)
+        # Only the query itself: the bare name in the response ("London" for
+        # "London, CA") would hijack the plain name for everyone else
+        self._aliases.set(normalize_city_name(city_name), key)
+        self._observations.set(key, (time.monotonic(), weather_data))
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Mark key as being refreshed; False if a refresh is already running"""
+        if key in self._refreshing:
+            return False
+        self._refreshing.add(key)
+        self.refreshes += 1
+        return True
+
+    def end_refresh(self, key: Hashable) -> None:
+        """Clear the in-progress refresh mark for key"""
+        self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, int]:
+        """Get observation cache counters"""
+        return {
+            **self._observations.stats(),
+            'stale_hits': self.stale_hits,
+            'refreshes': self.refreshes
+        }
@@ -1,9 +1,19 @@
-from typing import Optional, Dict, Any, Tuple
+import asyncio
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple, Union
+from urllib.parse import urlsplit
 
-import requests
+from httpx import Response
 
+from utils.ErrorLogger import logEvent
 from utils.KeyManagerUtils import KeyManager
+from utils.HttpClient import AsyncHttpClient, run_sync
+from utils.SingleFlight import SingleFlight, request_key
+from utils.QuotaManager import QuotaManager, QuotaExceededError, Priority
+from utils.CircuitBreaker import CircuitOpenError
 from services.TimeZoneService import TimezoneService
+from services.WeatherCache import WeatherCache
+from utils.Cache import normalize_city_name
 from models.WeatherConfig import WeatherConfig
 
 
@@ -36,6 +46,11 @@ class WeatherData:
 
     def __init__(self, data: Dict[str, Any]):
         self.raw_data = data
+        self.city_id = data.get('id')
+        self.latitude = data.get('coord', {}).get('lat')
+        self.longitude = data.get('coord', {}).get('lon')
+        # Shift from UTC in seconds (under 'sys' in /group responses)
+        self.utc_offset = data.get('timezone', data.get('sys', {}).get('timezone'))
         self.temperature = Temperature(data['main']['temp'])
         self.feels_like = Temperature(data['main']['feels_like'])
         self.condition = data['weather'][0]['main']
@@ -60,18 +75,40 @@ class OpenWeatherMapAPI:
             self,
             config: Optional[WeatherConfig] = None,
             key_manager: Optional[KeyManager] = None,
-            timezone_service: Optional[TimezoneService] = None
+            timezone_service: Optional[TimezoneService] = None,
+            http_client: Optional[AsyncHttpClient] = None,
+            cache: Optional[WeatherCache] = None,
+            single_flight: Optional[SingleFlight] = None,
+            quota: Optional[QuotaManager] = None
     ):
         """Initialize the API handler"""
         self.config = config or WeatherConfig()
         self.key_manager = key_manager or KeyManager()
         self.timezone_service = timezone_service or TimezoneService()
+        self.http_client = http_client or AsyncHttpClient()
+        self.single_flight = single_flight or SingleFlight()
+        self.cache = cache or WeatherCache(
+            fresh_ttl=self.config.cache_ttl,
+            stale_ttl=self.config.stale_ttl,
+            max_size=self.config.cache_size
+        )
+        self.quota = quota
         self._api_key = self.key_manager.get_key(self.config.owm_key_file)
-
-    def get_current_weather(self, city_name: str) -> WeatherData:
+        self._background_tasks: set[asyncio.Task] = set()
+        # Each call earns hedge_max_rate of a hedge, each hedge spends one
+        self._hedge_budget = self.config.hedge_burst
+        self.hedged_calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.hedges_skipped = 0
+
+    async def get_current_weather_async(self, city_name: str) -> WeatherData:
         """
         Get current weather for a city
 
+        Fresh cached observations are returned directly; stale ones are
+        returned immediately while a single background refresh runs.
+
         Args:
             city_name: Name of the city
 
@@ -85,13 +122,34 @@ class OpenWeatherMapAPI:
         if not isinstance(city_name, str):
             raise TypeError("City name must be a string")
 
+        weather_data, is_stale = self.cache.lookup(city_name)
+        if weather_data is not None:
+            if is_stale:
+                self._schedule_refresh(city_name)
+            return weather_data
+
+        weather_data = await self._fetch_weather(city_name)
+        self.cache.store(city_name, weather_data)
+        return weather_data
+
+    async def _fetch_weather(self, city_name: str) -> WeatherData:
+        """Fetch current weather for a city, sharing identical in-flight calls"""
         url = f"{self.config.base_url}/weather"
         params = {
             'q': city_name,
             'appid': self._api_key
         }
 
-        response = requests.get(url, params=params)
+        async def call() -> Response:
+            self.http_client.check_circuit(url)
+            if self.quota is not None:
+                self.quota.acquire(url, Priority.HIGH)
+            return await self._get_hedged(url, params)
+
+        response = await self.single_flight.do(
+            request_key(url, {'q': normalize_city_name(city_name)}),
+            call
+        )
 
         if response.status_code == 404:
             raise ValueError(f"City not found: {city_name}")
@@ -99,9 +157,205 @@ class OpenWeatherMapAPI:
         response.raise_for_status()
         return WeatherData(response.json())
 
-    def format_weather_response(self, weather_data: WeatherData) -> str:
-        """Format weather data into a readable message"""
-        current_time = self.timezone_service.get_current_time(weather_data.city_name)
+    def _hedge_delay(self, url: str) -> Optional[float]:
+        """Time after which a call counts as slow, None while hedging is off or latency unknown"""
+        if not self.config.hedge_requests:
+            return None
+        latency = self.http_client.latency(urlsplit(url).netloc)
+        if len(latency) < self.http_client.config.min_latency_samples:
+            return None
+        return max(latency.percentile(self.config.hedge_percentile), self.config.hedge_min_delay)
+
+    def _spend_hedge(self, url: str) -> bool:
+        """Take one hedge from the rate budget and the upstream quota, False if either is short"""
+        if self._hedge_budget < 1:
+            return False
+        if self.quota is not None:
+            try:
+                self.quota.acquire(url, Priority.HIGH)
+            except QuotaExceededError:
+                return False
+        self._hedge_budget -= 1
+        return True
+
+    async def _get_hedged(self, url: str, params: Dict[str, Any]) -> Response:
+        """
+        GET that sends one duplicate request if the first is slower than usual
+
+        Whichever request succeeds first wins and the other one is cancelled.
+        Hedges are limited to hedge_max_rate of all calls so they don't
+        double the quota spent.
+        """
+        self.hedged_calls += 1
+        self._hedge_budget = min(self._hedge_budget + self.config.hedge_max_rate, self.config.hedge_burst)
+
+        primary = asyncio.ensure_future(self.http_client.get(url, params=params))
+        delay = self._hedge_delay(url)
+        if delay is None:
+            return await primary
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(primary), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+
+        if not self._spend_hedge(url):
+            self.hedges_skipped += 1
+            return await primary
+
+        self.hedges += 1
+        hedge = asyncio.ensure_future(self.http_client.get(url, params=params))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+            # Both failed, report the original call's error
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get observation cache and request hedging counters"""
+        return {
+            'cache': self.cache.stats(),
+            'hedging': {
+                'calls': self.hedged_calls,
+                'hedges': self.hedges,
+                'hedge_wins': self.hedge_wins,
+                'skipped_over_budget': self.hedges_skipped,
+                'hedge_rate': self.hedges / self.hedged_calls if self.hedged_calls else 0.0
+            }
+        }
+
+    async def get_current_weather_many_async(
+            self,
+            city_names: list[str],
+            max_age: Optional[float] = None
+    ) -> Dict[str, Union[WeatherData, Exception]]:
+        """
+        Get current weather for many cities at once
+
+        Cached cities cost nothing, cities whose OpenWeatherMap id is known
+        are fetched together through the /group endpoint, and the rest with
+        a bounded number of concurrent single-city requests.
+
+        Args:
+            city_names: City names as typed by the user
+            max_age: Fetch cities whose cached observation is older than this
+                many seconds instead of serving it (stale or not)
+
+        Returns:
+            Weather data, or the exception that prevented getting it, per
+            city name (in input order, "london" merged into an earlier "London")
+        """
+        unique: Dict[str, str] = {}
+        for city_name in city_names:
+            unique.setdefault(normalize_city_name(city_name), city_name)
+        city_names = list(unique.values())
+
+        results: Dict[str, Union[WeatherData, Exception]] = {}
+        by_id: Dict[int, list[str]] = {}
+        by_name: list[str] = []
+        for city_name in city_names:
+            weather_data, is_stale = self.cache.lookup(city_name, max_age)
+            if weather_data is not None:
+                if is_stale:
+                    self._schedule_refresh(city_name)
+                results[city_name] = weather_data
+            elif (city_id := self.cache.city_id(city_name)) is not None:
+                by_id.setdefault(city_id, []).append(city_name)
+            else:
+                by_name.append(city_name)
+
+        ids = list(by_id)
+        groups = [ids[i:i + self.config.group_size] for i in range(0, len(ids), self.config.group_size)]
+        for group, fetched in zip(groups, await asyncio.gather(
+                *(self._fetch_group(group) for group in groups), return_exceptions=True
+        )):
+            for city_id in group:
+                weather_data = fetched.get(city_id) if isinstance(fetched, dict) else None
+                if weather_data is None:
+                    # Group call failed or skipped the city, ask for it by name
+                    by_name.extend(by_id[city_id])
+                    continue
+                for city_name in by_id[city_id]:
+                    self.cache.store(city_name, weather_data)
+                    results[city_name] = weather_data
+
+        semaphore = asyncio.Semaphore(self.config.batch_concurrency)
+
+        async def fetch_one(city_name: str) -> Union[WeatherData, Exception]:
+            async with semaphore:
+                try:
+                    # Missed the cache above (or was too old for max_age), fetch it
+                    weather_data = await self._fetch_weather(city_name)
+                except Exception as e:
+                    return e
+                self.cache.store(city_name, weather_data)
+                return weather_data
+
+        for city_name, result in zip(by_name, await asyncio.gather(*map(fetch_one, by_name))):
+            results[city_name] = result
+
+        return {city_name: results[city_name] for city_name in city_names}
+
+    async def _fetch_group(self, city_ids: list[int]) -> Dict[int, WeatherData]:
+        """Fetch current weather for up to group_size city ids in one call"""
+        url = f"{self.config.base_url}/group"
+        params = {
+            'id': ','.join(map(str, city_ids)),
+            'appid': self._api_key
+        }
+
+        async def call() -> Response:
+            self.http_client.check_circuit(url)
+            if self.quota is not None:
+                self.quota.acquire(url, Priority.HIGH)
+            return await self.http_client.get(url, params=params)
+
+        response = await self.single_flight.do(request_key(url, {'id': params['id']}), call)
+        response.raise_for_status()
+        return {
+            item['id']: WeatherData(item)
+            for item in response.json().get('list', [])
+        }
+
+    def get_current_weather(self, city_name: str) -> WeatherData:
+        """Get current weather for a city (sync wrapper)"""
+        return run_sync(self.get_current_weather_async(city_name))
+
+    def _schedule_refresh(self, city_name: str) -> None:
+        """Start a background refresh for a stale city unless one is running"""
+        key = self.cache.canonical_key(city_name)
+        if not self.cache.begin_refresh(key):
+            return
+
+        task = asyncio.create_task(self._refresh(city_name, key))
+        # Keep a reference so the task isn't garbage collected mid-flight
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _refresh(self, city_name: str, key) -> None:
+        """Refetch weather for a city and replace its cached observation"""
+        try:
+            self.cache.store(city_name, await self._fetch_weather(city_name))
+        except Exception as e:
+            logEvent(e, self._refresh, user_input=city_name)
+        finally:
+            self.cache.end_refresh(key)
+
+    def _render_weather(self, weather_data: WeatherData, current_time: str) -> str:
+        """Render weather data and local time into a readable message"""
         temps, feels = weather_data.format_temperatures(self.config.temp_precision)
 
         return (
@@ -113,7 +367,40 @@ class OpenWeatherMapAPI:
             f"The weather is {weather_data.condition} ({weather_data.description})"
         )
 
-    def get_formatted_weather(self, city_name: str) -> str:
+    def _local_time(self, weather_data: WeatherData) -> Optional[str]:
+        """Get local time from coordinates and offset carried by the observation"""
+        return self.timezone_service.get_current_time_at(
+            latitude=weather_data.latitude,
+            longitude=weather_data.longitude,
+            utc_offset=weather_data.utc_offset
+        )
+
+    async def _local_time_async(self, weather_data: WeatherData) -> Optional[str]:
+        """Get local time from coordinates and offset carried by the observation, off the event loop"""
+        return await self.timezone_service.get_current_time_at_async(
+            latitude=weather_data.latitude,
+            longitude=weather_data.longitude,
+            utc_offset=weather_data.utc_offset
+        )
+
+    async def format_weather_response_async(self, weather_data: WeatherData) -> str:
+        """Format weather data into a readable message"""
+        current_time = (
+            await self._local_time_async(weather_data)
+            # Geocoding round-trip only if the payload had no location data
+            or await self.timezone_service.get_current_time_async(weather_data.city_name)
+        )
+        return self._render_weather(weather_data, current_time)
+
+    def format_weather_response(self, weather_data: WeatherData) -> str:
+        """Format weather data into a readable message"""
+        current_time = (
+            self._local_time(weather_data)
+            or self.timezone_service.get_current_time(weather_data.city_name)
+        )
+        return self._render_weather(weather_data, current_time)
+
+    async def get_formatted_weather_async(self, city_name: str) -> str:
         """
         Get formatted weather report for a city
 
@@ -124,17 +411,55 @@ class OpenWeatherMapAPI:
             Formatted weather report string
         """
         try:
-            weather_data = self.get_current_weather(city_name)
-            return self.format_weather_response(weather_data)
-        except ValueError as e:
-            return "City not found. Please, try again."
+            weather_data = await self.get_current_weather_async(city_name)
+            return await self.format_weather_response_async(weather_data)
         except Exception as e:
-            return f"Error getting weather data: {str(e)}"
+            return self.error_message(e)
+
+    @staticmethod
+    def error_message(error: Exception) -> str:
+        """Explain to the user why weather for a city couldn't be shown"""
+        if isinstance(error, ValueError):
+            return "City not found. Please, try again."
+        if isinstance(error, QuotaExceededError):
+            return "Weather service has reached its request limit. Please, try again in a minute."
+        if isinstance(error, CircuitOpenError):
+            return "Weather service is unavailable right now. Please, try again in a minute."
+        return f"Error getting weather data: {str(error)}"
+
+    async def get_formatted_weather_many_async(self, city_names: list[str]) -> list[str]:
+        """
+        Get formatted weather reports for many cities
+
+        Args:
+            city_names: City names as typed by the user
+
+        Returns:
+            One report (or error explanation) per distinct city, in input order
+        """
+        reports = []
+        for city_name, result in (await self.get_current_weather_many_async(city_names)).items():
+            if isinstance(result, Exception):
+                reports.append(f"{city_name}: {self.error_message(result)}")
+            else:
+                reports.append(await self.format_weather_response_async(result))
+        return reports
+
+    def get_formatted_weather(self, city_name: str) -> str:
+        """Get formatted weather report for a city (sync wrapper)"""
+        return run_sync(self.get_formatted_weather_async(city_name))
+
+
+@lru_cache(maxsize=None)
+def _get_default_api() -> OpenWeatherMapAPI:
+    """Create default instance for backward compatibility on first use"""
+    return OpenWeatherMapAPI()
+
 
+def weather_request(city_name: str) -> str:
+    """Backward compatible function for getting formatted weather"""
+    return _get_default_api().get_formatted_weather(city_name)
 
-# Create default instance for backward compatibility
-_default_api = OpenWeatherMapAPI()
-weather_request = _default_api.get_formatted_weather
 
 if __name__ == '__main__':
     # Example usage
@@ -0,0 +1,276 @@
+"""
+Multi-process entry point for the Weather Assistant Bot
+
+The supervisor long-polls Telegram and routes every update to one of N
+worker processes by chat_id, so all messages of a chat land on the same
+worker and keep their order. Every worker runs a full WeatherBot fed through
+its own queue. Workers that die are restarted; SIGHUP restarts them one by
+one after they drained their queue. Aggregated worker stats are printed
+periodically.
+
+Usage:
+    python supervisor.py [--workers 4] [--stats-interval 30]
+
+Point TELEGRAM_BASE_URL at a local Bot API stand-in (see
+benchmarks/telegram_stub.py) to load test it offline.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import time
+from typing import Any, Dict, Optional
+
+from telegram import Bot, Update
+
+from models.BotConfig import BotConfig
+from models.QuotaConfig import QuotaConfig
+from utils.KeyManagerUtils import KeyManager
+
+# Put into a worker queue to make the worker finish queued updates and exit
+_STOP = None
+
+
+def _worker_main(index: int, workers: int, updates: multiprocessing.Queue, stats: multiprocessing.Queue,
+                 stats_interval: float) -> None:
+    """Worker process entry point"""
+    # Read by the configs of files and budgets that must not be shared between workers
+    os.environ['BOT_WORKER_INDEX'] = str(index)
+    os.environ['BOT_WORKERS'] = str(workers)
+    # Ctrl+C reaches the whole process group; the supervisor stops workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(_serve_shard(index, updates, stats, stats_interval))
+
+
+async def _serve_shard(index: int, updates: multiprocessing.Queue, stats: multiprocessing.Queue,
+                       stats_interval: float) -> None:
+    """Feed updates from the supervisor to a WeatherBot until told to stop"""
+    from services.CustomWeatherBot import WeatherBot
+
+    bot = WeatherBot()
+    application = bot.build_application(updater=False)
+    received = 0
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(stats_interval)
+            stats.put({'worker': index, 'pid': os.getpid(), 'received': received,
+                       **bot.update_processor.stats()})
+
+    async with application:
+        await application.start()
+        await bot._on_startup(application)
+        reporter = asyncio.create_task(report())
+        try:
+            while True:
+                try:
+                    data = await asyncio.to_thread(updates.get, timeout=0.5)
+                except queue.Empty:
+                    continue
+                if data is _STOP:
+                    break
+                received += 1
+                await application.update_queue.put(Update.de_json(data, application.bot))
+        finally:
+            reporter.cancel()
+            # Waits for the updates already handed to the application
+            await application.stop()
+            await bot._on_shutdown(application)
+            stats.put({'worker': index, 'pid': os.getpid(), 'received': received,
+                       **bot.update_processor.stats()})
+
+
+class Supervisor:
+    """Routes updates to worker processes by chat and keeps the workers alive"""
+
+    def __init__(self, workers: int, config: Optional[BotConfig] = None, stats_interval: float = 30.0,
+                 poll_timeout: int = 10):
+        """
+        Initialize supervisor
+
+        Args:
+            workers: Number of worker processes
+            config: Bot configuration (token file, Bot API base URL)
+            stats_interval: Seconds between two stats reports
+            poll_timeout: Long polling timeout for getUpdates, seconds
+        """
+        self.config = config or BotConfig()
+        self.workers = workers
+        self.stats_interval = stats_interval
+        self.poll_timeout = poll_timeout
+        # Workers must start from a clean interpreter, not a fork of the event loop
+        self._context = multiprocessing.get_context('spawn')
+        self._queues = [self._context.Queue() for _ in range(workers)]
+        self._stats = self._context.Queue()
+        self._processes: list[Optional[multiprocessing.Process]] = [None] * workers
+        self._worker_stats: Dict[int, Dict[str, Any]] = {}  # Latest report by worker pid
+        self._stopping = asyncio.Event()
+        self._restart_task: Optional[asyncio.Task] = None
+        self.routed = [0] * workers
+        self.restarts = [0] * workers
+
+    def shard_for(self, update: Update) -> int:
+        """Worker index for an update, stable for a chat"""
+        if update.effective_chat is not None:
+            key = update.effective_chat.id
+        elif update.effective_user is not None:
+            key = update.effective_user.id
+        else:
+            key = update.update_id
+        return key % self.workers
+
+    def _spawn(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(index, self.workers, self._queues[index], self._stats, self.stats_interval),
+            name=f'weather-bot-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        self._processes[index] = process
+
+    def _check_workers(self) -> None:
+        """Restart workers that exited"""
+        for index, process in enumerate(self._processes):
+            if process is not None and not process.is_alive():
+                print(f"Worker {index} (pid {process.pid}) exited with code {process.exitcode}, restarting")
+                self.restarts[index] += 1
+                self._spawn(index)
+
+    async def _stop_worker(self, index: int, timeout: float = 30.0) -> None:
+        """Let a worker finish its queued updates, then stop it"""
+        process = self._processes[index]
+        self._processes[index] = None
+        self._queues[index].put(_STOP)
+        await asyncio.to_thread(process.join, timeout)
+        if process.is_alive():
+            process.terminate()
+            await asyncio.to_thread(process.join)
+
+    async def restart_workers(self) -> None:
+        """Restart workers one at a time so the others keep serving"""
+        for index in range(self.workers):
+            if self._stopping.is_set():
+                return
+            await self._stop_worker(index)
+            self.restarts[index] += 1
+            self._spawn(index)
+
+    def _collect_stats(self) -> None:
+        while True:
+            try:
+                report = self._stats.get_nowait()
+            except queue.Empty:
+                return
+            self._worker_stats[report['pid']] = report
+
+    def stats(self) -> Dict[str, Any]:
+        """Aggregate the latest report of every worker, restarted ones included"""
+        self._collect_stats()
+        reports = list(self._worker_stats.values())
+        alive = {p.pid for p in self._processes if p is not None and p.is_alive()}
+        counters = {
+            name: sum(report.get(name, 0) for report in reports)
+            for name in ('received', 'processed', 'dropped')
+        }
+        # Queue gauges only make sense for workers still running
+        gauges = {
+            name: sum(report.get(name, 0) for report in reports if report['pid'] in alive)
+            for name in ('in_flight', 'pending')
+        }
+        return {
+            'workers_alive': len(alive),
+            'routed': sum(self.routed),
+            **counters,
+            **gauges,
+            'wait_p95_ms_max': max((report.get('wait_p95_ms', 0) for report in reports), default=0),
+            'restarts': sum(self.restarts),
+            'per_worker_routed': list(self.routed)
+        }
+
+    async def _report_stats(self) -> None:
+        while not self._stopping.is_set():
+            await asyncio.sleep(self.stats_interval)
+            print(f"Supervisor stats: {self.stats()}")
+
+    def _install_signal_handlers(self) -> None:
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self._stopping.set)
+        if hasattr(signal, 'SIGHUP'):
+            loop.add_signal_handler(signal.SIGHUP, self._on_sighup)
+
+    def _on_sighup(self) -> None:
+        """Start a rolling restart unless one is already running"""
+        if self._restart_task is not None and not self._restart_task.done():
+            print("Rolling restart already in progress, ignoring SIGHUP")
+            return
+        self._restart_task = asyncio.get_running_loop().create_task(self.restart_workers())
+
+    async def _poll(self, bot: Bot) -> None:
+        """Fetch updates and route them until asked to stop"""
+        offset = None
+        while not self._stopping.is_set():
+            try:
+                updates = await bot.get_updates(offset=offset, timeout=self.poll_timeout)
+            except Exception as e:
+                print(f"getUpdates failed: {e}")
+                await asyncio.sleep(1)
+                continue
+            for update in updates:
+                index = self.shard_for(update)
+                self._queues[index].put(update.to_dict())
+                self.routed[index] += 1
+                offset = update.update_id + 1
+            self._check_workers()
+
+    async def run(self) -> None:
+        """Start workers and route updates until SIGINT/SIGTERM"""
+        token = KeyManager().get_key(self.config.telegram_key_path)
+        bot = Bot(token, base_url=self.config.telegram_base_url or 'https://api.telegram.org/bot')
+
+        for index in range(self.workers):
+            self._spawn(index)
+        self._install_signal_handlers()
+        reporter = asyncio.create_task(self._report_stats())
+        started = time.monotonic()
+
+        async with bot:
+            await bot.delete_webhook()
+            poller = asyncio.create_task(self._poll(bot))
+            await self._stopping.wait()
+            poller.cancel()
+            await asyncio.gather(poller, return_exceptions=True)
+
+        reporter.cancel()
+        if self._restart_task is not None:
+            # Returns after the worker being restarted is back
+            await self._restart_task
+        print("Stopping workers...")
+        await asyncio.gather(*(
+            self._stop_worker(index) for index, process in enumerate(self._processes) if process is not None
+        ))
+        print(f"Supervisor stats after {time.monotonic() - started:.0f}s: {self.stats()}")
+
+
+def main() -> int:
+    # Every worker gets an equal share of the upstream budgets, so they cap the worker count
+    max_workers = QuotaConfig(workers=1).max_workers
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=min(os.cpu_count() or 1, max_workers),
+                        help=f'Number of worker processes (at most {max_workers})')
+    parser.add_argument('--stats-interval', type=float, default=30.0, help='Seconds between stats reports')
+    args = parser.parse_args()
+    if not 1 <= args.workers <= max_workers:
+        parser.error(f"--workers must be between 1 and {max_workers}")
+
+    print(f"Starting Weather Assistant Bot supervisor with {args.workers} workers...")
+    asyncio.run(Supervisor(args.workers, stats_interval=args.stats_interval).run())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from models.AlertConfig import AlertConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER,
+    city TEXT NOT NULL,
+    city_key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    threshold TEXT NOT NULL,
+    active INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    UNIQUE (chat_id, city_key, field, operator, threshold)
+);
+CREATE INDEX IF NOT EXISTS alert_rules_chat ON alert_rules (chat_id);
+"""
+
+_COLUMNS = "id, chat_id, user_id, city, city_key, field, operator, threshold, active"
+
+
+@dataclass
+class AlertRule:
+    """Threshold on one weather field of one city, watched for one chat"""
+    id: Optional[int]
+    chat_id: int
+    user_id: Optional[int]
+    city: str
+    city_key: str  # Normalized city name, shared by all rules of the city
+    field: str  # temperature, feels_like, wind, humidity, pressure or condition
+    operator: str  # <, <=, >, >= or = (condition only supports =)
+    threshold: str  # Number, or condition name such as "thunderstorm"
+    active: bool = False  # Condition held at the last check (already notified)
+
+    def describe(self) -> str:
+        """Human readable rule, e.g. "London: temperature < -5" """
+        return f"{self.city}: {self.field} {self.operator} {self.threshold}"
+
+
+class AlertStore:
+    """
+    SQLite store of alert rules
+
+    The engine keeps every rule in memory, indexed by city and field, so the
+    store is only read on start and written when rules or their triggered
+    state change. All calls run the blocking SQLite work in a thread.
+    """
+
+    def __init__(self, config: Optional[AlertConfig] = None):
+        """Initialize store with configuration, the database is opened on first use"""
+        self.config = config or AlertConfig()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.config.store_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.config.store_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params: tuple = (), many: bool = False) -> int:
+        with self._lock:
+            connection = self._connect()
+            cursor = connection.executemany(sql, params) if many else connection.execute(sql, params)
+            connection.commit()
+            return cursor.rowcount
+
+    @staticmethod
+    def _rule(row: tuple) -> AlertRule:
+        return AlertRule(*row[:-1], active=bool(row[-1]))
+
+    async def add(self, rule: AlertRule) -> AlertRule:
+        """Create a rule (an identical rule of the chat is kept), returns it with its id and state"""
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR IGNORE INTO alert_rules "
+            "(chat_id, user_id, city, city_key, field, operator, threshold, active, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?)",
+            (rule.chat_id, rule.user_id, rule.city, rule.city_key, rule.field, rule.operator,
+             rule.threshold, time.time())
+        )
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT {_COLUMNS} FROM alert_rules "
+            "WHERE chat_id = ? AND city_key = ? AND field = ? AND operator = ? AND threshold = ?",
+            (rule.chat_id, rule.city_key, rule.field, rule.operator, rule.threshold)
+        )
+        return self._rule(rows[0])
+
+    def _delete(self, where: str, params: tuple) -> list[int]:
+        with self._lock:
+            connection = self._connect()
+            ids = [row[0] for row in connection.execute(f"SELECT id FROM alert_rules WHERE {where}", params)]
+            connection.execute(f"DELETE FROM alert_rules WHERE {where}", params)
+            connection.commit()
+            return ids
+
+    async def remove(self, chat_id: int, rule_id: Optional[int] = None) -> list[int]:
+        """Remove a rule of the chat, or all of them; returns the ids removed"""
+        if rule_id is None:
+            return await asyncio.to_thread(self._delete, "chat_id = ?", (chat_id,))
+        return await asyncio.to_thread(self._delete, "chat_id = ? AND id = ?", (chat_id, rule_id))
+
+    async def all(self, shards: int = 1, shard: int = 0) -> list[AlertRule]:
+        """
+        Get every rule, or those of the chats in one shard
+
+        Args:
+            shards: Number of shards chats are split into by chat_id modulo
+            shard: Shard to return
+
+        Returns:
+            Rules of chats whose chat_id % shards == shard
+        """
+        # Python's modulo of a negative (group) chat id is never negative, SQLite's is
+        rows = await asyncio.to_thread(
+            self._query,
+            f"SELECT {_COLUMNS} FROM alert_rules WHERE ((chat_id % ?) + ?) % ? = ?",
+            (shards, shards, shards, shard)
+        )
+        return [self._rule(row) for row in rows]
+
+    async def set_active(self, states: list[tuple[int, bool]]) -> None:
+        """Persist triggered states, given as (rule id, active) pairs"""
+        await asyncio.to_thread(
+            self._execute,
+            "UPDATE alert_rules SET active = ? WHERE id = ?",
+            [(int(active), rule_id) for rule_id, active in states],
+            True
+        )
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -1,43 +1,113 @@
+import asyncio
 import random
-from typing import Optional, Dict, Any
+from collections import deque
+from functools import lru_cache
+from typing import Optional, Dict, Any, Callable
 
-import requests
-from mypy.types import names
-from requests import Response
+from httpx import Response
 
 from utils.ErrorLogger import logEvent
+from utils.HttpClient import AsyncHttpClient, run_sync
+from utils.Cache import TTLCache, normalize_city_name
+from utils.SingleFlight import SingleFlight, request_key
+from utils.CityStore import CityStore
+from utils.QuotaManager import QuotaManager, QuotaExceededError, Priority
+from utils.CircuitBreaker import CircuitOpenError
 from models.ApiConfig import ApiConfig
 
 
 class ApiClient:
     """Base API client handling requests and error handling"""
 
-    def __init__(self, config: ApiConfig):
+    # Sections served by API Ninjas give way to weather when the budget runs low
+    priority: Priority = Priority.LOW
+
+    def __init__(
+            self,
+            config: ApiConfig,
+            http_client: Optional[AsyncHttpClient] = None,
+            single_flight: Optional[SingleFlight] = None,
+            quota: Optional[QuotaManager] = None
+    ):
         self.config = config
+        self.http_client = http_client or AsyncHttpClient()
+        self.single_flight = single_flight or SingleFlight()
+        self.quota = quota
 
-    def _make_request(
+    async def _get(
+            self,
+            url: str,
+            headers: Dict[str, str],
+            params: Optional[Dict[str, Any]],
+            priority: Priority
+    ) -> Response:
+        """Make the upstream call, charging it to the quota first"""
+        self.http_client.check_circuit(url)
+        if self.quota is not None:
+            self.quota.acquire(url, priority)
+        return await self.http_client.get(url, headers=headers, params=params)
+
+    async def _make_request_async(
             self,
             endpoint: str,
             params: Optional[Dict[str, Any]] = None,
-            extra_headers: Optional[Dict[str, str]] = None
+            extra_headers: Optional[Dict[str, str]] = None,
+            coalesce: bool = True,
+            priority: Optional[Priority] = None
     ) -> Response:
-        """Make HTTP request with error handling"""
+        """
+        Make non-blocking HTTP request with error handling
+
+        Identical concurrent requests (same endpoint and params) share one
+        upstream call unless coalesce is False. The call is charged at the
+        client's priority unless another one is given.
+
+        Raises:
+            QuotaExceededError: If the upstream budget can't afford the call
+            CircuitOpenError: If the upstream is failing and calls are short-circuited
+        """
         headers = self.config.headers
         if extra_headers:
             headers.update(extra_headers)
 
-        response = requests.get(
-            self.config.get_url(endpoint),
-            headers=headers,
-            params=params
-        )
+        url = self.config.get_url(endpoint)
+        priority = self.priority if priority is None else priority
+        if coalesce:
+            response = await self.single_flight.do(
+                request_key(url, params),
+                lambda: self._get(url, headers, params, priority)
+            )
+        else:
+            response = await self._get(url, headers, params, priority)
         response.raise_for_status()
         return response
 
+    def _make_request(
+            self,
+            endpoint: str,
+            params: Optional[Dict[str, Any]] = None,
+            extra_headers: Optional[Dict[str, str]] = None
+    ) -> Response:
+        """Make HTTP request with error handling (sync wrapper)"""
+        return run_sync(self._make_request_async(endpoint, params, extra_headers))
+
 
 class CityAPI(ApiClient):
     """Handle city-related API requests"""
 
+    def __init__(
+            self,
+            config: ApiConfig,
+            http_client: Optional[AsyncHttpClient] = None,
+            single_flight: Optional[SingleFlight] = None,
+            cache: Optional[TTLCache] = None,
+            store: Optional[CityStore] = None,
+            quota: Optional[QuotaManager] = None
+    ):
+        super().__init__(config, http_client, single_flight, quota)
+        self.cache = cache or TTLCache(config.city_cache_size, config.city_cache_ttl)
+        self.store = store
+
     def _format_city_response(self, city_data) -> Optional[str]:
 
         is_capital: str = 'not capital'
@@ -56,82 +126,279 @@ class CityAPI(ApiClient):
             f"{city_data['region']}!"
         )
 
+    async def get_city_data_async(self, city_name: str, priority: Optional[Priority] = None) -> Dict[str, Any]:
+        """Get comprehensive city data (cached by normalized city name)"""
+        cache_key = normalize_city_name(city_name)
+        if (city_data := self.cache.get(cache_key)) is not None:
+            return city_data
 
-    def get_city_data(self, city_name: str) -> Dict[str, Any]:
-        """Get comprehensive city data"""
         try:
-            response = self._make_request('city', params={'name': city_name})
-            return response.json()[0]
+            try:
+                # Population and timezone lookups for one message race for the same key
+                return await self.single_flight.do(
+                    ('city', cache_key),
+                    lambda: self._fetch_city_data(city_name, cache_key, priority)
+                )
+            except QuotaExceededError:
+                if priority != Priority.HIGH:
+                    raise
+                # The shared call may have been a low priority one refused by the reserve
+                return await self._fetch_city_data(city_name, cache_key, priority)
+        except (QuotaExceededError, CircuitOpenError):
+            raise
         except Exception as e:
             logEvent(e.__cause__, self.get_city_data, user_input=city_name)
             raise
 
-    def get_coordinates(self, city_name: str) -> tuple[Optional[float], Optional[float]]:
+    async def _fetch_city_data(
+            self,
+            city_name: str,
+            cache_key: str,
+            priority: Optional[Priority] = None
+    ) -> Dict[str, Any]:
+        """Fetch city data from the persistent store or the upstream API and cache it"""
+        if self.store is not None:
+            if (city_data := await asyncio.to_thread(self.store.get_city, cache_key)) is not None:
+                self.cache.set(cache_key, city_data)
+                return city_data
+
+        response = await self._make_request_async('city', params={'name': city_name}, priority=priority)
+        city_data = response.json()[0]
+        self.cache.set(cache_key, city_data)
+        if self.store is not None:
+            self.store.put_city(cache_key, city_data)
+        return city_data
+
+    def get_city_data(self, city_name: str) -> Dict[str, Any]:
+        """Get comprehensive city data (sync wrapper)"""
+        return run_sync(self.get_city_data_async(city_name))
+
+    async def get_coordinates_async(self, city_name: str) -> tuple[Optional[float], Optional[float]]:
         """Get city coordinates (latitude, longitude)"""
         try:
-            city_data = self.get_city_data(city_name)
+            # Local time in the weather reply falls back to them, so they may spend the reserve
+            city_data = await self.get_city_data_async(city_name, Priority.HIGH)
             return city_data['latitude'], city_data['longitude']
         except Exception as e:
             logEvent(e.__cause__, self.get_coordinates, user_input=city_name)
             return None, None
 
-    def get_population_info(self, city_name: str) -> str:
+    def get_coordinates(self, city_name: str) -> tuple[Optional[float], Optional[float]]:
+        """Get city coordinates (sync wrapper)"""
+        return run_sync(self.get_coordinates_async(city_name))
+
+    async def get_population_info_async(self, city_name: str) -> str:
         """Get formatted population information"""
         if not isinstance(city_name, str):
             raise TypeError("City name must be a string")
 
         try:
-            city_data = self.get_city_data(city_name)
+            city_data = await self.get_city_data_async(city_name)
             return self._format_city_response(city_data)
 
+        except (QuotaExceededError, CircuitOpenError):
+            return "City facts are taking a break right now, try again later."
         except Exception as e:
             logEvent(e.__cause__, self.get_population_info, user_input=city_name)
             return f"Something is wrong. Are you sure there is such a city? Can you check the map please?"
 
+    def get_population_info(self, city_name: str) -> str:
+        """Get formatted population information (sync wrapper)"""
+        return run_sync(self.get_population_info_async(city_name))
+
 
 class HistoricalAPI(ApiClient):
-    """Handle historical events API requests"""
+    """
+    Handle historical events API requests
 
-    def get_random_event(self, year: Optional[int] = None) -> str:
+    Every event returned for a year is cached (events are immutable), and a
+    background task keeps a buffer of random events ready. Under quota
+    pressure, and for most draws once enough years are cached, events come
+    from cached years instead of the upstream API.
+    """
+
+    min_year: int = -351
+    max_year: int = 2023
+
+    def __init__(
+            self,
+            config: ApiConfig,
+            http_client: Optional[AsyncHttpClient] = None,
+            single_flight: Optional[SingleFlight] = None,
+            quota: Optional[QuotaManager] = None,
+            quota_pressure: Optional[Callable[[], bool]] = None
+    ):
+        super().__init__(config, http_client, single_flight, quota)
+        if quota_pressure is None:
+            quota_pressure = (
+                (lambda: quota.under_pressure(config.base_url)) if quota is not None else (lambda: False)
+            )
+        self.quota_pressure = quota_pressure
+        # Year -> all its events; never expires, there are only ~2400 years
+        self.cache = TTLCache(self.max_year - self.min_year + 1, float('inf'))
+        # Years the API has no events for, kept out of the cache and not drawn again
+        self._empty_years: set[int] = set()
+        self._buffer: deque[str] = deque()
+        self._buffer_wakeup = asyncio.Event()
+        self._prefetch_task: Optional[asyncio.Task] = None
+        self.buffer_hits = 0
+        self.buffer_underflows = 0
+
+    def _format_event(self, year: int, event: str) -> str:
+        return f'Did you know that in year: {year} - {event}'
+
+    def _choose_year(self) -> int:
+        """Pick a random year, preferring cached ones under quota pressure"""
+        cached_years = self.cache.keys()
+        if cached_years and (
+                self.quota_pressure()
+                or (len(cached_years) >= self.config.event_min_cached_years
+                    and random.random() < self.config.event_reuse_ratio)
+        ):
+            return random.choice(cached_years)
+        year = random.randint(self.min_year, self.max_year)
+        for _ in range(10):
+            if year not in self._empty_years:
+                break
+            year = random.randint(self.min_year, self.max_year)
+        return year
+
+    async def get_year_events_async(self, year: int) -> list[str]:
+        """Get all events of a year, from cache when possible"""
+        if (events := self.cache.get(year)) is not None:
+            return events
+
+        response = await self._make_request_async('historicalevents', params={'year': year})
+        events = [item['event'] for item in response.json()]
+        if events:
+            self.cache.set(year, events)
+        else:
+            self._empty_years.add(year)
+        return events
+
+    async def get_random_event_async(self, year: Optional[int] = None) -> str:
         """Get random historical event, optionally for specific year"""
         if year is None:
-            year = random.randint(-351, 2023)
+            if self._buffer:
+                self.buffer_hits += 1
+                self._buffer_wakeup.set()
+                return self._buffer.popleft()
+            self.buffer_underflows += 1
+            self._buffer_wakeup.set()
+            year = self._choose_year()
 
         try:
-            response = self._make_request('historicalevents', params={'year': year})
-            event = response.json()[0]['event']
-            return f'Did you know that in year: {year} - {event}'
+            events = await self.get_year_events_async(year)
+            if not events:
+                return "Nothing to show this time"
+            return self._format_event(year, random.choice(events))
+        except (QuotaExceededError, CircuitOpenError):
+            return "Nothing to show this time"
         except Exception as e:
             logEvent(e.__cause__, self.get_random_event, user_input=year)
             return "Nothing to show this time"
 
+    def get_random_event(self, year: Optional[int] = None) -> str:
+        """Get random historical event (sync wrapper)"""
+        return run_sync(self.get_random_event_async(year))
+
+    def start_prefetch(self) -> None:
+        """Start keeping the random event buffer filled (needs a running event loop)"""
+        if self._prefetch_task is None:
+            self._prefetch_task = asyncio.create_task(self._prefetch_loop())
+
+    async def stop_prefetch(self) -> None:
+        """Stop the background buffer refill"""
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            await asyncio.gather(self._prefetch_task, return_exceptions=True)
+            self._prefetch_task = None
+
+    async def _prefetch_loop(self) -> None:
+        while True:
+            if len(self._buffer) >= self.config.event_buffer_size:
+                self._buffer_wakeup.clear()
+                await self._buffer_wakeup.wait()
+                continue
+
+            year = self._choose_year()
+            try:
+                if events := await self.get_year_events_async(year):
+                    self._buffer.append(self._format_event(year, random.choice(events)))
+            except (QuotaExceededError, CircuitOpenError):
+                # Wait for the budget window to move on or the upstream to recover
+                await asyncio.sleep(self.config.event_refill_interval * 10)
+            except Exception as e:
+                logEvent(e, self._prefetch_loop, user_input=year)
+                # Don't hammer a failing upstream
+                await asyncio.sleep(self.config.event_refill_interval * 10)
+            await asyncio.sleep(self.config.event_refill_interval)
+
+    def stats(self) -> Dict[str, int]:
+        """Get year cache and buffer counters"""
+        return {
+            **self.cache.stats(),
+            'empty_years': len(self._empty_years),
+            'buffered': len(self._buffer),
+            'buffer_hits': self.buffer_hits,
+            'buffer_underflows': self.buffer_underflows
+        }
+
 
 class ImageAPI(ApiClient):
     """Handle random image API requests"""
 
-    def get_random_image(self, category: Optional[str] = None) -> Optional[bytes]:
+    async def get_random_image_async(self, category: Optional[str] = None) -> Optional[bytes]:
         """Get random image data directly"""
         try:
             params = {'category': category} if category else None
-            response = self._make_request(
+            response = await self._make_request_async(
                 endpoint='randomimage',
                 params=params,
-                extra_headers={'Accept': 'image/jpg'}
+                extra_headers={'Accept': 'image/jpg'},
+                coalesce=False  # Every caller should get its own random image
             )
-            return response.content if response.ok else None
+            return response.content if response.is_success else None
+        except (QuotaExceededError, CircuitOpenError):
+            return None
         except Exception as e:
             logEvent(e.__cause__, self.get_random_image)
             return None
 
+    def get_random_image(self, category: Optional[str] = None) -> Optional[bytes]:
+        """Get random image data directly (sync wrapper)"""
+        return run_sync(self.get_random_image_async(category))
+
 
 class APIService:
     """Main service class combining all API functionality"""
 
-    def __init__(self, config: Optional[ApiConfig] = None):
+    def __init__(
+            self,
+            config: Optional[ApiConfig] = None,
+            http_client: Optional[AsyncHttpClient] = None,
+            single_flight: Optional[SingleFlight] = None,
+            store: Optional[CityStore] = None,
+            quota: Optional[QuotaManager] = None
+    ):
         self.config = config or ApiConfig()
-        self.city_api = CityAPI(self.config)
-        self.historical_api = HistoricalAPI(self.config)
-        self.image_api = ImageAPI(self.config)
+        self.http_client = http_client or AsyncHttpClient()
+        self.single_flight = single_flight or SingleFlight()
+        self.city_api = CityAPI(self.config, self.http_client, self.single_flight, store=store, quota=quota)
+        self.historical_api = HistoricalAPI(self.config, self.http_client, self.single_flight, quota=quota)
+        self.image_api = ImageAPI(self.config, self.http_client, self.single_flight, quota=quota)
+
+    async def get_city_coordinates_async(self, city_name: str) -> tuple[Optional[float], Optional[float]]:
+        return await self.city_api.get_coordinates_async(city_name)
+
+    async def get_city_population_info_async(self, city_name: str) -> str:
+        return await self.city_api.get_population_info_async(city_name)
+
+    async def get_random_event_async(self, year: Optional[int] = None) -> str:
+        return await self.historical_api.get_random_event_async(year)
+
+    async def get_random_image_async(self, category: Optional[str] = None) -> Optional[bytes]:
+        return await self.image_api.get_random_image_async(category)
 
     def get_city_coordinates(self, city_name: str) -> tuple[Optional[float], Optional[float]]:
         return self.city_api.get_coordinates(city_name)
@@ -146,16 +413,34 @@ class APIService:
         return self.image_api.get_random_image(category)
 
 
-# Create a default instance for backward compatibility
-_default_service = APIService()
-get_city_lat = lambda city_name: _default_service.get_city_coordinates(city_name)[0]
-get_city_lng = lambda city_name: _default_service.get_city_coordinates(city_name)[1]
-get_city_population_info = _default_service.get_city_population_info
-get_random_event = _default_service.get_random_event
-get_random_image = _default_service.get_random_image
+@lru_cache(maxsize=None)
+def _get_default_service() -> APIService:
+    """Create a default instance for backward compatibility on first use"""
+    return APIService()
+
+
+def get_city_lat(city_name: str) -> Optional[float]:
+    return _get_default_service().get_city_coordinates(city_name)[0]
+
+
+def get_city_lng(city_name: str) -> Optional[float]:
+    return _get_default_service().get_city_coordinates(city_name)[1]
+
+
+def get_city_population_info(city_name: str) -> str:
+    return _get_default_service().get_city_population_info(city_name)
+
+
+def get_random_event(year: Optional[int] = None) -> str:
+    return _get_default_service().get_random_event(year)
+
+
+def get_random_image(category: Optional[str] = None) -> Optional[bytes]:
+    return _get_default_service().get_random_image(category)
+
 
 if __name__ == '__main__':
     # Example usage
     api_service = APIService()
     print(api_service.get_random_image())
-    print(api_service.get_city_population_info('London'))
\ No newline at end of file
+    print(api_service.get_city_population_info('London'))
@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from models.CircuitBreakerConfig import CircuitBreakerConfig
+from utils.ErrorLogger import logEvent
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open circuit breaker for one upstream
+
+    While closed, calls go through and their outcomes are tracked. Too many
+    consecutive failures, or a high error rate over the recent calls, open
+    the circuit: calls then fail immediately with CircuitOpenError. After
+    open_seconds a limited number of trial calls is let through (half-open);
+    a successful trial closes the circuit, a failed one opens it again.
+    """
+
+    def __init__(self, name: str, config: Optional[CircuitBreakerConfig] = None):
+        """
+        Initialize breaker
+
+        Args:
+            name: Upstream name used in logs and metrics
+            config: Failure thresholds and open duration
+        """
+        self.name = name
+        self.config = config or CircuitBreakerConfig()
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=self.config.window_size)
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._trials = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the cooldown passed"""
+        with self._lock:
+            self._cool_down()
+            return self._state
+
+    def _cool_down(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.config.open_seconds:
+            self._transition(HALF_OPEN, "cooldown over, letting trial calls through")
+
+    def _transition(self, state: str, reason: str) -> None:
+        previous, self._state = self._state, state
+        self._trials = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+        if state == CLOSED:
+            self._outcomes.clear()
+            self._consecutive_failures = 0
+        logEvent(f"Circuit {self.name}: {previous} -> {state} ({reason})", self._transition)
+
+    def before_call(self) -> None:
+        """
+        Check whether a call may go through
+
+        Raises:
+            CircuitOpenError: If the circuit is open or half-open with its trials in flight
+        """
+        with self._lock:
+            self._cool_down()
+            if self._state == CLOSED:
+                return
+            if self._state == HALF_OPEN and self._trials < self.config.half_open_max_calls:
+                self._trials += 1
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit for {self.name} is open")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED, "trial call succeeded")
+                return
+            self._consecutive_failures = 0
+            self._outcomes.append(True)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(OPEN, f"trial call failed: {error!r}")
+                return
+            if self._state == OPEN:
+                return
+
+            self._consecutive_failures += 1
+            self._outcomes.append(False)
+            failures = self._outcomes.count(False)
+            if self._consecutive_failures >= self.config.consecutive_failures:
+                self._transition(OPEN, f"{self._consecutive_failures} failures in a row, last: {error!r}")
+            elif (len(self._outcomes) >= self.config.min_calls
+                  and failures / len(self._outcomes) >= self.config.error_rate):
+                self._transition(OPEN, f"{failures} of last {len(self._outcomes)} calls failed, last: {error!r}")
+
+    def record_cancelled(self) -> None:
+        """Forget a call abandoned by its caller, freeing its trial slot"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Get state and counters"""
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'recent_error_rate': (
+                    self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+                ),
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
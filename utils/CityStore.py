@@ -0,0 +1,154 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any
+
+from models.StoreConfig import StoreConfig
+from utils.ErrorLogger import logEvent
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cities (
+    key TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS timezones (
+    key TEXT PRIMARY KEY,
+    timezone TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Marker telling the writer thread to flush and exit
+_STOP = object()
+
+
+class CityStore:
+    """
+    Persistent SQLite store for city metadata and resolved timezones
+
+    Nothing is opened at construction time: the database is created on the
+    first lookup. Reads go straight to SQLite, writes are queued and
+    committed in batches by a background thread (write-behind).
+    """
+
+    def __init__(self, config: Optional[StoreConfig] = None):
+        """Initialize store with configuration"""
+        self.config = config or StoreConfig()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._writes: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database (once) for reading"""
+        with self._lock:
+            if self._connection is None:
+                self._connection = self._open()
+            return self._connection
+
+    def _open(self) -> sqlite3.Connection:
+        """Open a new connection, creating database file and schema if needed"""
+        self.config.store_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.config.store_path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+        return connection
+
+    def _read(self, table: str, column: str, key: str) -> Optional[str]:
+        """Read a value newer than the configured max age"""
+        connection = self._connect()
+        with self._lock:
+            row = connection.execute(
+                f"SELECT {column} FROM {table} WHERE key = ? AND updated_at >= ?",
+                (key, time.time() - self.config.max_age)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _enqueue(self, table: str, column: str, key: str, value: str) -> None:
+        """Queue a write for the background writer"""
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_loop,
+                        name='CityStoreWriter',
+                        daemon=True
+                    )
+                    self._writer.start()
+        self._writes.put((table, column, key, value, time.time()))
+
+    def _write_loop(self) -> None:
+        """Commit queued writes in batches until stopped"""
+        connection = self._open()
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._writes.get(timeout=self.config.flush_interval)
+                while item is not _STOP:
+                    batch.append(item)
+                    if len(batch) >= self.config.write_batch_size:
+                        break
+                    item = self._writes.get_nowait()
+                stopping = item is _STOP
+            except queue.Empty:
+                pass
+
+            if batch:
+                try:
+                    for table, column, key, value, updated_at in batch:
+                        connection.execute(
+                            f"INSERT OR REPLACE INTO {table} (key, {column}, updated_at) VALUES (?, ?, ?)",
+                            (key, value, updated_at)
+                        )
+                    connection.commit()
+                except Exception as e:
+                    logEvent(e, self._write_loop)
+        connection.close()
+
+    def get_city(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get stored city data
+
+        Args:
+            key: Normalized city name
+
+        Returns:
+            City data or None if missing or too old
+        """
+        data = self._read('cities', 'data', key)
+        return json.loads(data) if data is not None else None
+
+    def put_city(self, key: str, city_data: Dict[str, Any]) -> None:
+        """Store city data (write-behind)"""
+        self._enqueue('cities', 'data', key, json.dumps(city_data, ensure_ascii=False))
+
+    def get_timezone(self, key: str) -> Optional[str]:
+        """
+        Get stored timezone
+
+        Args:
+            key: Location key (see TimezoneService)
+
+        Returns:
+            Timezone string or None if missing or too old
+        """
+        return self._read('timezones', 'timezone', key)
+
+    def put_timezone(self, key: str, timezone: str) -> None:
+        """Store resolved timezone (write-behind)"""
+        self._enqueue('timezones', 'timezone', key, timezone)
+
+    def close(self) -> None:
+        """Flush pending writes and close the database"""
+        if self._writer is not None:
+            self._writes.put(_STOP)
+            self._writer.join()
+            self._writer = None
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
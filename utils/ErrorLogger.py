@@ -1,17 +1,95 @@
-from datetime import datetime
-from typing import Any, Optional, Callable
+from collections import OrderedDict
+from typing import Any, Optional, Callable, Hashable
+import atexit
 import logging
-import traceback
+import logging.handlers
+import queue
+import threading
 from pathlib import Path
 from models.LogConfig import LogConfig
+from utils.LogRotation import CompressingRotatingFileHandler
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that leaves all formatting to the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats message and traceback in the calling
+        # thread; we only enqueue the record as is
+        return record
+
+
+class DeduplicatingHandler(logging.Handler):
+    """
+    Collapses identical events within a time window into one record
+
+    Events are identical when their dedup_key (exception type, function,
+    message) matches. The first one is written right away; repeats within
+    the window are counted and summarized in a single record once the
+    window is over (on the next event or on close).
+    """
+
+    def __init__(self, target: logging.Handler, window: float):
+        super().__init__()
+        self.target = target
+        self.window = window
+        # key -> [first record, repeat count], oldest window first
+        self._windows: OrderedDict[Hashable, list] = OrderedDict()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._expire(record.created)
+
+        key = getattr(record, 'dedup_key', None) or (record.levelno, record.getMessage())
+        window = self._windows.get(key)
+        if window is not None:
+            window[1] += 1
+            return
+
+        self._windows[key] = [record, 0]
+        self.target.handle(record)
+
+    def _expire(self, now: float) -> None:
+        """Close windows that are over, writing repeat summaries"""
+        while self._windows:
+            key, (first, repeats) = next(iter(self._windows.items()))
+            if now - first.created < self.window:
+                break
+            del self._windows[key]
+            self._summarize(first, repeats)
+
+    def _summarize(self, first: logging.LogRecord, repeats: int) -> None:
+        if repeats:
+            summary = logging.makeLogRecord(first.__dict__)
+            summary.msg = f"{first.getMessage()} | Repeated: {repeats} more time(s) within {self.window:g}s"
+            summary.args = None
+            summary.exc_info = None
+            summary.exc_text = None
+            self.target.handle(summary)
+
+    def flush(self) -> None:
+        self.target.flush()
+
+    def close(self) -> None:
+        for first, repeats in self._windows.values():
+            self._summarize(first, repeats)
+        self._windows.clear()
+        self.target.close()
+        super().close()
 
 
 class EventLogger:
-    """Handles logging of events and errors"""
+    """
+    Handles logging of events and errors
+
+    Callers only put records on a queue; a background listener formats
+    them (including tracebacks), collapses repeats and writes the file.
+    """
 
     def __init__(self, config: Optional[LogConfig] = None):
         """Initialize logger with configuration"""
         self.config = config or LogConfig()
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._file_handler: Optional[CompressingRotatingFileHandler] = None
         self._logger = self._setup_logger()
 
     def _setup_logger(self) -> logging.Logger:
@@ -19,13 +97,24 @@ class EventLogger:
         # Create logger
         logger = logging.getLogger('WeatherBotLogger')
         logger.setLevel(self.config.level)
+        logger.propagate = False
 
-        # Create handlers
-        file_handler = logging.FileHandler(
+        # Another instance already runs the pipeline for this logger
+        if logger.handlers:
+            return logger
+
+        # Create handlers (the file is opened by the listener on first write)
+        self.config.logs_folder.mkdir(parents=True, exist_ok=True)
+        file_handler = CompressingRotatingFileHandler(
             self.config.error_logs_path,
+            max_bytes=self.config.max_bytes,
+            rotate_interval=self.config.rotate_interval,
+            backup_count=self.config.backup_count,
+            retention_days=self.config.retention_days,
             encoding=self.config.encoding
         )
         file_handler.setLevel(self.config.level)
+        self._file_handler = file_handler
 
         # Create formatters
         formatter = logging.Formatter(
@@ -34,9 +123,18 @@ class EventLogger:
         )
         file_handler.setFormatter(formatter)
 
+        # Only the listener thread formats and does I/O
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._listener = logging.handlers.QueueListener(
+            log_queue,
+            DeduplicatingHandler(file_handler, self.config.dedup_window),
+            respect_handler_level=True
+        )
+        self._listener.start()
+        atexit.register(self.close)
+
         # Add handlers to logger
-        if not logger.handlers:
-            logger.addHandler(file_handler)
+        logger.addHandler(DeferredQueueHandler(log_queue))
 
         return logger
 
@@ -64,12 +162,25 @@ class EventLogger:
 
         # Create detailed message
         message = self._format_message(event, func_name, user_input)
+        extra = {'dedup_key': self._dedup_key(event, func_name)}
 
-        # Log with appropriate level
+        # Log with appropriate level, traceback is rendered by the listener
         if isinstance(event, Exception):
-            self._logger.exception(message)
+            self._logger.log(
+                level,
+                message,
+                exc_info=(type(event), event, event.__traceback__),
+                extra=extra
+            )
         else:
-            self._logger.log(level, message)
+            self._logger.log(level, message, extra=extra)
+
+    @staticmethod
+    def _dedup_key(event: Optional[Any], func_name: str) -> Hashable:
+        """Identity of an event for collapsing repeats"""
+        if isinstance(event, Exception):
+            return type(event).__name__, func_name, str(event)
+        return None, func_name, str(event)
 
     def _format_message(
             self,
@@ -84,7 +195,6 @@ class EventLogger:
         if event is not None:
             if isinstance(event, Exception):
                 parts.append(f"Event: {type(event).__name__}: {str(event)}")
-                parts.append(f"Traceback: {traceback.format_exc()}")
             else:
                 parts.append(f"Event: {str(event)}")
 
@@ -97,24 +207,49 @@ class EventLogger:
 
         return " | ".join(parts)
 
+    def close(self) -> None:
+        """Write out everything still queued and stop the listener"""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+
     def rotate_log_file(self, max_size_mb: float = 10.0) -> None:
         """
-        Rotate log file if it exceeds maximum size
+        Rotate log file now if it exceeds maximum size
+
+        Rotation normally happens automatically inside the pipeline (see
+        LogConfig.max_bytes and rotate_interval); this forces it early.
 
         Args:
             max_size_mb: Maximum log file size in megabytes
         """
-        log_path = Path(self.config.log_file)
-        if log_path.exists():
-            size_mb = log_path.stat().st_size / (1024 * 1024)
-            if size_mb > max_size_mb:
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                backup_path = log_path.with_name(f"{log_path.stem}_{timestamp}{log_path.suffix}")
-                log_path.rename(backup_path)
+        if self._file_handler is None:
+            return
+
+        log_path = Path(self.config.error_logs_path)
+        if log_path.exists() and log_path.stat().st_size / (1024 * 1024) > max_size_mb:
+            # Same lock the listener holds while writing
+            self._file_handler.acquire()
+            try:
+                self._file_handler.doRollover()
+            finally:
+                self._file_handler.release()
+
+
+_default_logger: Optional[EventLogger] = None
+_default_logger_lock = threading.Lock()
 
 
-# Create default logger instance
-_default_logger = EventLogger()
+def _get_default_logger() -> EventLogger:
+    """Create default logger instance on first use (from any thread)"""
+    global _default_logger
+    if _default_logger is None:
+        with _default_logger_lock:
+            if _default_logger is None:
+                _default_logger = EventLogger()
+    return _default_logger
 
 
 # For backward compatibility
@@ -131,7 +266,7 @@ def logEvent(
         function: The function where the event occurred
         user_input: The input that caused the event
     """
-    _default_logger.log_event(event, function, user_input)
+    _get_default_logger().log_event(event, function, user_input)
 
 
 if __name__ == '__main__':
@@ -150,4 +285,4 @@ if __name__ == '__main__':
         lambda x: x,
         {"test": "data"},
         level=logging.INFO
-    )
\ No newline at end of file
+    )
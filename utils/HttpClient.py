@@ -0,0 +1,226 @@
+import asyncio
+import weakref
+from collections import deque
+from typing import Optional, Dict, Any, Awaitable, TypeVar
+from urllib.parse import urlsplit
+
+import httpx
+
+from models.CircuitBreakerConfig import CircuitBreakerConfig
+from models.HttpConfig import HttpConfig
+from utils.CircuitBreaker import CircuitBreaker, CircuitOpenError, OPEN
+
+T = TypeVar('T')
+
+# Clients whose pools run_sync closes before its short-lived loop ends
+_instances: 'weakref.WeakSet[AsyncHttpClient]' = weakref.WeakSet()
+
+
+class LatencyTracker:
+    """Recent latencies of one upstream, for percentile based timeouts"""
+
+    def __init__(self, config: HttpConfig):
+        self.config = config
+        self._samples: deque[float] = deque(maxlen=config.latency_samples)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, share: float) -> Optional[float]:
+        """Latency below which the given share of recent calls finished, None without samples"""
+        if not self._samples:
+            return None
+        samples = sorted(self._samples)
+        return samples[min(int(len(samples) * share), len(samples) - 1)]
+
+    @property
+    def timeout(self) -> float:
+        """Request deadline: a multiple of the tail latency, within configured bounds"""
+        if not self.config.adaptive_timeout or len(self._samples) < self.config.min_latency_samples:
+            return self.config.read_timeout
+        tail = self.percentile(self.config.timeout_percentile) * self.config.timeout_multiplier
+        return min(max(tail, self.config.min_request_timeout), self.config.read_timeout)
+
+
+class AsyncHttpClient:
+    """
+    Async HTTP client keeping one keep-alive connection pool per upstream host
+
+    Every host also gets a circuit breaker and a request deadline adapted to
+    its recent latency, so a failing or hung upstream costs callers little.
+    """
+
+    def __init__(self, config: Optional[HttpConfig] = None, breaker_config: Optional[CircuitBreakerConfig] = None):
+        """Initialize client with connection, timeout and circuit breaker configuration"""
+        self.config = config or HttpConfig()
+        self.breaker_config = breaker_config or CircuitBreakerConfig()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latencies: Dict[str, LatencyTracker] = {}
+        _instances.add(self)
+
+    def _client_for(self, url: str) -> httpx.AsyncClient:
+        """Get (or lazily create) the pooled client for the host of given URL"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Pools are bound to the loop that created them; sync wrappers run
+            # every call in a fresh loop (and close its pools, see run_sync)
+            self._clients = {}
+            self._loop = loop
+
+        host = urlsplit(url).netloc
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                limits=self.config.limits
+            )
+            self._clients[host] = client
+        return client
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        """Get (or lazily create) the circuit breaker of a host"""
+        if host not in self._breakers:
+            self._breakers[host] = CircuitBreaker(host, self.breaker_config)
+        return self._breakers[host]
+
+    def latency(self, host: str) -> LatencyTracker:
+        """Get (or lazily create) the latency tracker of a host"""
+        if host not in self._latencies:
+            self._latencies[host] = LatencyTracker(self.config)
+        return self._latencies[host]
+
+    def check_circuit(self, url: str) -> None:
+        """
+        Fail fast if the host of given URL is known to be down
+
+        Lets callers skip work they'd do before the request (e.g. spending
+        quota) when the request would be refused anyway.
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open
+        """
+        breaker = self.breaker(urlsplit(url).netloc)
+        if breaker.state == OPEN:
+            breaker.rejected += 1
+            raise CircuitOpenError(f"Circuit for {breaker.name} is open")
+
+    async def get(
+            self,
+            url: str,
+            params: Optional[Dict[str, Any]] = None,
+            headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Perform GET request through the pool of the target host
+
+        Args:
+            url: Full request URL
+            params: Optional query parameters
+            headers: Optional request headers
+
+        Returns:
+            Fully read response
+
+        Raises:
+            CircuitOpenError: If the host's circuit is open (no request is made)
+            httpx.TimeoutException: If the host didn't answer within its adaptive deadline
+        """
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        latency = self.latency(host)
+        breaker.before_call()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        timeout = latency.timeout
+        try:
+            response = await asyncio.wait_for(
+                self._client_for(url).get(url, params=params, headers=headers),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            error = httpx.TimeoutException(f"{host} did not answer within {timeout:.2f}s")
+            breaker.record_failure(error)
+            raise error
+        except httpx.TransportError as e:
+            breaker.record_failure(e)
+            raise
+        except asyncio.CancelledError:
+            breaker.record_cancelled()
+            raise
+        except Exception as e:
+            # Decoding errors, redirect loops, ...: still settle the call so a
+            # half-open circuit doesn't keep its trial slot forever
+            breaker.record_failure(e)
+            raise
+
+        # Client errors (unknown city, ...) say nothing about the upstream's health
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure(httpx.HTTPStatusError(
+                f"{response.status_code} from {host}", request=response.request, response=response
+            ))
+        else:
+            latency.record(loop.time() - started)
+            breaker.record_success()
+        return response
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get circuit state, error rate and latency based timeout per host"""
+        stats = {}
+        for host, breaker in self._breakers.items():
+            latency = self.latency(host)
+            p50, p99 = latency.percentile(0.5), latency.percentile(0.99)
+            stats[host] = {
+                **breaker.stats(),
+                'latency_p50_ms': p50 * 1000 if p50 is not None else None,
+                'latency_p99_ms': p99 * 1000 if p99 is not None else None,
+                'timeout_ms': latency.timeout * 1000
+            }
+        return stats
+
+    async def aclose(self) -> None:
+        """Close all pooled connections"""
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+def run_sync(coroutine: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous code
+
+    Only meant for thin sync wrappers (``__main__`` examples, backward
+    compatible helpers); async code must await the coroutine directly.
+
+    Args:
+        coroutine: Coroutine to run
+
+    Returns:
+        Result of the coroutine
+
+    Raises:
+        RuntimeError: If called while an event loop is already running
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_closing_pools(coroutine))
+
+    coroutine.close()
+    raise RuntimeError("Sync wrapper called inside a running event loop, await the async variant instead")
+
+
+async def _closing_pools(coroutine: Awaitable[T]) -> T:
+    """Await a coroutine, then close the pools opened in this (short-lived) loop"""
+    try:
+        return await coroutine
+    finally:
+        loop = asyncio.get_running_loop()
+        for client in list(_instances):
+            if client._loop is loop:
+                await client.aclose()
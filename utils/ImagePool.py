@@ -0,0 +1,133 @@
+import asyncio
+from collections import deque
+from typing import Optional, Dict
+
+from models.ImagePoolConfig import ImagePoolConfig
+from utils.ApiUtils import ImageAPI
+from utils.ErrorLogger import logEvent
+
+
+class ImagePrefetchPool:
+    """
+    Keeps random images downloaded ahead of time, per category
+
+    A background task refills the pool with its own concurrency limit and
+    rate, so handlers only pop a ready image and fall back to a live
+    download when the pool runs dry.
+    """
+
+    def __init__(self, image_api: ImageAPI, config: Optional[ImagePoolConfig] = None):
+        """
+        Initialize pool
+
+        Args:
+            image_api: API used to download images
+            config: Pool size, memory cap and refill limits
+        """
+        self.image_api = image_api
+        self.config = config or ImagePoolConfig()
+        self._images: Dict[Optional[str], deque[bytes]] = {
+            category: deque() for category in self.config.categories
+        }
+        self._pending: Dict[Optional[str], int] = {category: 0 for category in self.config.categories}
+        self._bytes = 0
+        self._wakeup = asyncio.Event()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        self._fetch_tasks: set[asyncio.Task] = set()
+        self.hits = 0
+        self.underflows = 0
+        self.fetched = 0
+        self.dropped = 0
+        self.failures = 0
+
+    def pop(self, category: Optional[str] = None) -> Optional[bytes]:
+        """Take a ready image, or None if the pool has none for this category"""
+        images = self._images.get(category)
+        if images:
+            image = images.popleft()
+            self._bytes -= len(image)
+            self.hits += 1
+            self._wakeup.set()
+            return image
+
+        self.underflows += 1
+        self._wakeup.set()
+        return None
+
+    async def get(self, category: Optional[str] = None) -> Optional[bytes]:
+        """Take a ready image, downloading one live if the pool is empty"""
+        if (image := self.pop(category)) is not None:
+            return image
+        return await self.image_api.get_random_image_async(category)
+
+    def start(self) -> None:
+        """Start the background refill task (needs a running event loop)"""
+        if self._refill_task is None:
+            self._semaphore = asyncio.Semaphore(self.config.max_concurrent_fetches)
+            self._refill_task = asyncio.create_task(self._refill_loop())
+
+    async def stop(self) -> None:
+        """Stop refilling and cancel downloads in flight"""
+        tasks = [task for task in (self._refill_task, *self._fetch_tasks) if task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refill_task = None
+
+    def _missing(self, category: Optional[str]) -> int:
+        """Number of images to fetch for a category, respecting the memory cap"""
+        if self._bytes >= self.config.max_bytes:
+            return 0
+        return self.config.size_per_category - len(self._images[category]) - self._pending[category]
+
+    async def _refill_loop(self) -> None:
+        """Top up every category, then sleep until an image is taken"""
+        while True:
+            self._wakeup.clear()
+            refilled = False
+            for category in self.config.categories:
+                while self._missing(category) > 0:
+                    await self._semaphore.acquire()
+                    self._pending[category] += 1
+                    task = asyncio.create_task(self._fetch_one(category))
+                    self._fetch_tasks.add(task)
+                    task.add_done_callback(self._fetch_tasks.discard)
+                    refilled = True
+                    await asyncio.sleep(self.config.refill_interval)
+
+            if not refilled:
+                await self._wakeup.wait()
+
+    async def _fetch_one(self, category: Optional[str]) -> None:
+        """Download one image into the pool"""
+        try:
+            image = await self.image_api.get_random_image_async(category)
+            if image is None:
+                self.failures += 1
+                # Don't hammer a failing upstream
+                await asyncio.sleep(self.config.refill_interval * 10)
+            elif self._bytes + len(image) > self.config.max_bytes:
+                self.dropped += 1
+            else:
+                self._images[category].append(image)
+                self._bytes += len(image)
+                self.fetched += 1
+        except Exception as e:
+            self.failures += 1
+            logEvent(e, self._fetch_one, user_input=category)
+        finally:
+            self._pending[category] -= 1
+            self._semaphore.release()
+
+    def stats(self) -> Dict[str, int]:
+        """Get pool size and hit/underflow counters"""
+        return {
+            'ready': sum(len(images) for images in self._images.values()),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'underflows': self.underflows,
+            'fetched': self.fetched,
+            'dropped': self.dropped,
+            'failures': self.failures
+        }
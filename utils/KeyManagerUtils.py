@@ -159,8 +159,11 @@ class KeyManager:
         }
 
 
-# Create default instance for backward compatibility
-_default_manager = KeyManager()
+@lru_cache(maxsize=None)
+def _get_default_manager() -> KeyManager:
+    """Create default instance for backward compatibility on first use"""
+    return KeyManager()
+
 
 
 def get_private_key(filename: str) -> str:
@@ -173,7 +176,7 @@ def get_private_key(filename: str) -> str:
     Returns:
         Key string
     """
-    return _default_manager.get_key(filename)
+    return _get_default_manager().get_key(filename)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,126 @@
+import gzip
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+
+class CompressingRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    File handler rotating by size and/or age with compressed retention
+
+    Rotation itself is a rename done under the handler lock; gzip
+    compression and pruning of old segments run on a separate daemon
+    thread, so neither the emitting thread nor callers wait for them.
+    """
+
+    def __init__(
+            self,
+            filename: str,
+            max_bytes: int = 0,
+            rotate_interval: Optional[float] = None,
+            backup_count: int = 10,
+            retention_days: Optional[float] = None,
+            encoding: Optional[str] = None
+    ):
+        """
+        Initialize handler
+
+        Args:
+            filename: Active log file
+            max_bytes: Rotate before the file would exceed this size (0 disables)
+            rotate_interval: Rotate when the active file is older than this, seconds
+            backup_count: Number of compressed segments kept
+            retention_days: Compressed segments older than this are deleted
+            encoding: File encoding
+        """
+        super().__init__(filename, 'a', encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+        self.rotate_interval = rotate_interval
+        self.backup_count = backup_count
+        self.retention_days = retention_days
+        self._path = Path(self.baseFilename)
+        self._rollover_at = self._next_rollover(
+            self._path.stat().st_mtime if self._path.exists() else time.time()
+        )
+        self._jobs: queue.SimpleQueue = queue.SimpleQueue()
+        self._compressor = threading.Thread(
+            target=self._compress_loop,
+            name='LogCompressor',
+            daemon=True
+        )
+        self._compressor.start()
+        # Pick up segments left uncompressed by a previous run
+        self._jobs.put(None)
+
+    def _next_rollover(self, opened_at: float) -> Optional[float]:
+        return opened_at + self.rotate_interval if self.rotate_interval else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self._rollover_at is not None and record.created >= self._rollover_at:
+            return self._path.exists()
+
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            message = f"{self.format(record)}{self.terminator}"
+            if self.stream.tell() + len(message.encode(self.encoding or 'utf-8')) >= self.max_bytes:
+                return self.stream.tell() > 0
+        return False
+
+    def doRollover(self) -> None:
+        """Rename the active file aside and queue it for compression"""
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        if self._path.exists():
+            stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+            rotated = self._path.with_name(f"{self._path.name}.{stamp}")
+            suffix = 0
+            while rotated.exists() or rotated.with_name(rotated.name + '.gz').exists():
+                suffix += 1
+                rotated = self._path.with_name(f"{self._path.name}.{stamp}-{suffix}")
+            os.replace(self._path, rotated)
+            self._jobs.put(rotated)
+
+        self._rollover_at = self._next_rollover(time.time())
+
+    def _compress_loop(self) -> None:
+        while True:
+            rotated = self._jobs.get()
+            try:
+                if rotated is None:
+                    for leftover in sorted(self._path.parent.glob(f"{self._path.name}.*")):
+                        if leftover.suffix != '.gz':
+                            self._compress(leftover)
+                else:
+                    self._compress(rotated)
+                self._prune()
+            except Exception as e:
+                print(f"Error compressing rotated log: {e}")
+
+    @staticmethod
+    def _compress(path: Path) -> None:
+        """Gzip a rotated segment and remove the original"""
+        target = path.with_name(path.name + '.gz')
+        with open(path, 'rb') as source, gzip.open(target, 'wb') as compressed:
+            shutil.copyfileobj(source, compressed)
+        path.unlink()
+
+    def _prune(self) -> None:
+        """Keep at most backup_count segments, none older than retention_days"""
+        segments = sorted(
+            self._path.parent.glob(f"{self._path.name}.*.gz"),
+            key=lambda segment: segment.stat().st_mtime,
+            reverse=True
+        )
+        cutoff = time.time() - self.retention_days * 24 * 3600 if self.retention_days else None
+        for position, segment in enumerate(segments):
+            if position >= self.backup_count or (cutoff and segment.stat().st_mtime < cutoff):
+                segment.unlink(missing_ok=True)
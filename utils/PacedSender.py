@@ -0,0 +1,84 @@
+import asyncio
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telegram.error import Forbidden, RetryAfter
+
+from utils.ErrorLogger import logEvent
+
+
+class PacedSender:
+    """
+    Sends bot-initiated messages to many chats without tripping Telegram's flood limits
+
+    Messages are started at most ``messages_per_second`` apart with a few in
+    flight at a time. RetryAfter is honoured once; a chat that blocked the
+    bot is reported through ``on_blocked`` so its owner can stop messaging it.
+    """
+
+    def __init__(
+            self,
+            messages_per_second: float,
+            max_concurrent_sends: int,
+            on_blocked: Optional[Callable[[int], Awaitable[Any]]] = None
+    ):
+        """
+        Initialize sender
+
+        Args:
+            messages_per_second: Start rate of sends
+            max_concurrent_sends: Sends in flight at a time
+            on_blocked: Coroutine function called with the id of a chat that blocked the bot
+        """
+        self.messages_per_second = messages_per_second
+        self.max_concurrent_sends = max_concurrent_sends
+        self.on_blocked = on_blocked
+        self.sent = 0
+        self.failures = 0
+
+    async def send_all(self, send: Callable[[int, str], Awaitable[Any]], messages: Dict[int, str]) -> None:
+        """
+        Send one message per chat
+
+        Args:
+            send: Coroutine function sending a text to a chat id
+            messages: Text per chat id
+        """
+        interval = 1 / self.messages_per_second
+        semaphore = asyncio.Semaphore(self.max_concurrent_sends)
+        tasks = []
+        for chat_id, text in messages.items():
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(self._send_one(send, chat_id, text, semaphore)))
+            await asyncio.sleep(interval)
+        await asyncio.gather(*tasks)
+
+    async def _send_one(
+            self,
+            send: Callable[[int, str], Awaitable[Any]],
+            chat_id: int,
+            text: str,
+            semaphore: asyncio.Semaphore
+    ) -> None:
+        try:
+            for attempt in range(2):
+                try:
+                    await send(chat_id, text)
+                    self.sent += 1
+                    return
+                except RetryAfter as e:
+                    retry_after = e.retry_after
+                    await asyncio.sleep(
+                        retry_after.total_seconds() if isinstance(retry_after, timedelta) else retry_after
+                    )
+            self.failures += 1
+        except Forbidden:
+            # The user blocked the bot or left the chat
+            self.failures += 1
+            if self.on_blocked is not None:
+                await self.on_blocked(chat_id)
+        except Exception as e:
+            self.failures += 1
+            logEvent(e, self._send_one, user_input=chat_id)
+        finally:
+            semaphore.release()
@@ -0,0 +1,133 @@
+import threading
+import time
+from enum import IntEnum
+from typing import Any, Dict, Hashable, Optional
+from urllib.parse import urlsplit
+
+from models.QuotaConfig import QuotaConfig
+from utils.Cache import TTLCache
+
+_WINDOW_SECONDS = {'minute': 60, 'day': 86400}
+
+
+class Priority(IntEnum):
+    """Importance of an upstream call when the budget runs low"""
+    HIGH = 0  # Weather, the section users ask for, and the coordinates its local time falls back to
+    LOW = 1  # Population, events, images and background prefetches
+
+
+class QuotaExceededError(Exception):
+    """Raised instead of making an upstream call the budget can't afford"""
+
+
+class QuotaManager:
+    """
+    Tracks upstream call budgets and per-user request rates
+
+    Every upstream host has fixed per-minute and per-day windows. Low
+    priority calls are refused once a window enters its reserve, so the
+    remaining budget goes to high priority calls. Users get a token bucket
+    each, so one user can't spend the budget of everyone else.
+    """
+
+    def __init__(self, config: Optional[QuotaConfig] = None):
+        """
+        Initialize quota manager
+
+        Args:
+            config: Upstream limits, priority reserve and user bucket size
+        """
+        self.config = config or QuotaConfig()
+        self._lock = threading.Lock()
+        # (host, window) -> [period, calls used in period]
+        self._usage: Dict[tuple[str, str], list[int]] = {}
+        self._rejected: Dict[tuple[str, Priority], int] = {}
+        # Buckets left alone long enough are full again, so they can just expire
+        self._buckets = TTLCache(
+            self.config.max_tracked_users,
+            self.config.user_burst * self.config.user_refill_seconds
+        )
+        self.users_rejected = 0
+
+    @staticmethod
+    def _host(url: str) -> str:
+        return urlsplit(url).netloc or url
+
+    def _used(self, host: str, window: str, now: float) -> list[int]:
+        """Usage entry of a window, reset when a new period started"""
+        period = int(now // _WINDOW_SECONDS[window])
+        usage = self._usage.setdefault((host, window), [period, 0])
+        if usage[0] != period:
+            usage[0], usage[1] = period, 0
+        return usage
+
+    def _threshold(self, limit: int, priority: Priority) -> float:
+        return limit if priority == Priority.HIGH else limit * (1 - self.config.low_priority_reserve)
+
+    def acquire(self, url: str, priority: Priority = Priority.LOW) -> None:
+        """
+        Account one upstream call, or refuse it if the budget can't afford it
+
+        Args:
+            url: Request URL (budgets are kept per host)
+            priority: Call priority
+
+        Raises:
+            QuotaExceededError: If the call would exceed the budget for its priority
+        """
+        host = self._host(url)
+        limits = self.config.upstream_limits.get(host, {})
+        now = time.time()
+        with self._lock:
+            windows = [(self._used(host, window, now), limit) for window, limit in limits.items()]
+            for (_, used), limit in windows:
+                if used >= self._threshold(limit, priority):
+                    key = (host, priority)
+                    self._rejected[key] = self._rejected.get(key, 0) + 1
+                    raise QuotaExceededError(f"{host} budget exhausted for {priority.name} priority calls")
+            for usage, _ in windows:
+                usage[1] += 1
+
+    def under_pressure(self, url: str) -> bool:
+        """Whether low priority calls to this host are being refused"""
+        host = self._host(url)
+        now = time.time()
+        with self._lock:
+            return any(
+                self._used(host, window, now)[1] >= self._threshold(limit, Priority.LOW)
+                for window, limit in self.config.upstream_limits.get(host, {}).items()
+            )
+
+    def allow_user(self, user_id: Hashable) -> bool:
+        """Take a token from the user's bucket, False if the user is over the rate"""
+        now = time.monotonic()
+        rate = 1 / self.config.user_refill_seconds
+        with self._lock:
+            tokens, updated = self._buckets.get(user_id, (self.config.user_burst, now))
+            tokens = min(self.config.user_burst, tokens + (now - updated) * rate)
+            if tokens < 1:
+                self._buckets.set(user_id, (tokens, now))
+                self.users_rejected += 1
+                return False
+            self._buckets.set(user_id, (tokens - 1, now))
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Get current window usage and rejections per upstream"""
+        now = time.time()
+        with self._lock:
+            upstreams = {}
+            for host, limits in self.config.upstream_limits.items():
+                upstreams[host] = {
+                    **{
+                        f'{window}_used': f'{self._used(host, window, now)[1]}/{limit}'
+                        for window, limit in limits.items()
+                    },
+                    'rejected_high': self._rejected.get((host, Priority.HIGH), 0),
+                    'rejected_low': self._rejected.get((host, Priority.LOW), 0)
+                }
+            return {
+                'upstreams': upstreams,
+                'users_tracked': len(self._buckets),
+                'users_rejected': self.users_rejected
+            }
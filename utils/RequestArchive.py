@@ -0,0 +1,283 @@
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+
+from utils.Cache import normalize_city_name
+
+_MAGIC = b'WBRQSEG1'
+_HEADER_SIZE = struct.Struct('<I')
+
+# Column name -> encoding. Integers are stored as little-endian int64
+# (timestamps delta-encoded), low-cardinality strings dictionary-encoded.
+COLUMNS: Dict[str, str] = {
+    'timestamp': 'int64-delta',
+    'user_id': 'int64',
+    'chat_id': 'int64',
+    'chat_type': 'dict',
+    'city': 'dict'
+}
+
+
+def _int_array(values: Iterable[int]) -> array:
+    return array('q', values)
+
+
+def _to_bytes(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _encode(encoding: str, values: Sequence[Any]) -> bytes:
+    """Encode one column into compressed bytes"""
+    if encoding == 'int64':
+        raw = _to_bytes(_int_array(values))
+    elif encoding == 'int64-delta':
+        raw = _to_bytes(_int_array(
+            value - previous for previous, value in zip([0, *values], values)
+        ))
+    else:
+        dictionary: Dict[Any, int] = {}
+        codes = array('I', (dictionary.setdefault(value, len(dictionary)) for value in values))
+        words = json.dumps(list(dictionary), ensure_ascii=False).encode('utf-8')
+        raw = _HEADER_SIZE.pack(len(words)) + words + _to_bytes(codes)
+    return zlib.compress(raw)
+
+
+def _decode(encoding: str, data: bytes) -> list:
+    """Decode compressed column bytes back into values"""
+    raw = zlib.decompress(data)
+    if encoding == 'int64':
+        return _from_bytes('q', raw).tolist()
+    if encoding == 'int64-delta':
+        values, total = [], 0
+        for delta in _from_bytes('q', raw):
+            total += delta
+            values.append(total)
+        return values
+
+    (size,) = _HEADER_SIZE.unpack_from(raw)
+    words = json.loads(raw[_HEADER_SIZE.size:_HEADER_SIZE.size + size])
+    return [words[code] for code in _from_bytes('I', raw[_HEADER_SIZE.size + size:])]
+
+
+class Segment:
+    """Read access to one archived segment, decoding columns on demand"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, 'rb') as segment_file:
+            if segment_file.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"Not a request archive segment: {path}")
+            (size,) = _HEADER_SIZE.unpack(segment_file.read(_HEADER_SIZE.size))
+            self.header = json.loads(segment_file.read(size))
+        self._data_start = len(_MAGIC) + _HEADER_SIZE.size + size
+        self._columns: Dict[str, list] = {}
+
+    @property
+    def rows(self) -> int:
+        return self.header['rows']
+
+    @property
+    def period_start(self) -> int:
+        return self.header['period_start']
+
+    @property
+    def period_end(self) -> int:
+        return self.header['period_end']
+
+    def column(self, name: str) -> list:
+        """Decode a single column (only its own bytes are read)"""
+        if name not in self._columns:
+            meta = self.header['columns'][name]
+            with open(self.path, 'rb') as segment_file:
+                segment_file.seek(self._data_start + meta['offset'])
+                data = segment_file.read(meta['length'])
+            self._columns[name] = _decode(meta['encoding'], data)
+        return self._columns[name]
+
+
+class RequestArchive:
+    """
+    Time-segmented, compressed, columnar archive of user requests
+
+    Every segment file holds the requests of one period with each column
+    (see COLUMNS) compressed separately, so scans decompress only the
+    columns they ask for.
+    """
+
+    def __init__(self, directory: Path, retention_days: Optional[float] = None):
+        """
+        Initialize archive
+
+        Args:
+            directory: Directory holding segment files
+            retention_days: Segments whose period ended longer ago are deleted
+        """
+        self.directory = Path(directory)
+        self.retention_days = retention_days
+
+    def write_segment(
+            self,
+            records: Iterable[Dict[str, Any]],
+            period_start: int,
+            period_end: int,
+            date_format: str
+    ) -> Optional[Path]:
+        """
+        Compact request records (as written by UserRequestLogger) into a segment
+
+        Args:
+            records: Request records in to_dict() format
+            period_start: Segment period start, epoch seconds
+            period_end: Segment period end, epoch seconds
+            date_format: Format of record timestamps
+
+        Returns:
+            Path of the written segment or None if there were no records
+        """
+        columns: Dict[str, list] = {name: [] for name in COLUMNS}
+        for record in records:
+            columns['timestamp'].append(
+                int(datetime.strptime(record['timestamp'], date_format).timestamp())
+            )
+            columns['user_id'].append(record['user']['id'])
+            columns['chat_id'].append(record['chat']['id'])
+            columns['chat_type'].append(record['chat']['type'])
+            columns['city'].append(normalize_city_name(record['message']['text'] or ''))
+
+        rows = len(columns['timestamp'])
+        if not rows:
+            return None
+
+        blobs, meta, offset = [], {}, 0
+        for name, encoding in COLUMNS.items():
+            blob = _encode(encoding, columns[name])
+            meta[name] = {'encoding': encoding, 'offset': offset, 'length': len(blob)}
+            blobs.append(blob)
+            offset += len(blob)
+
+        header = json.dumps({
+            'rows': rows,
+            'period_start': period_start,
+            'period_end': period_end,
+            'columns': meta
+        }).encode('utf-8')
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        label = datetime.fromtimestamp(period_start).strftime('%Y%m%d%H%M%S')
+        path = self.directory / f"segment-{label}.col"
+        suffix = 0
+        while path.exists():
+            # Same period sealed twice (e.g. clock moved back), keep both
+            suffix += 1
+            path = self.directory / f"segment-{label}-{suffix}.col"
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as segment_file:
+            segment_file.write(_MAGIC + _HEADER_SIZE.pack(len(header)) + header)
+            for blob in blobs:
+                segment_file.write(blob)
+        os.replace(tmp_path, path)
+        return path
+
+    def segments(self, since: Optional[int] = None, until: Optional[int] = None) -> Iterator[Segment]:
+        """Iterate segments overlapping [since, until] (epoch seconds), oldest first"""
+        if not self.directory.exists():
+            return
+        for path in sorted(self.directory.glob('segment-*.col')):
+            segment = Segment(path)
+            if since is not None and segment.period_end <= since:
+                continue
+            if until is not None and segment.period_start > until:
+                continue
+            yield segment
+
+    def scan(
+            self,
+            columns: Sequence[str],
+            since: Optional[int] = None,
+            until: Optional[int] = None,
+            where: Optional[Dict[str, Any]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream rows with the requested columns
+
+        Args:
+            columns: Column names to return
+            since: Only rows at or after this time, epoch seconds
+            until: Only rows at or before this time, epoch seconds
+            where: Equality filters {column: value}, evaluated before
+                any other column is decoded
+
+        Yields:
+            Row dictionaries holding only the requested columns
+        """
+        for segment in self.segments(since, until):
+            rows: Iterable[int] = range(segment.rows)
+
+            for name, value in (where or {}).items():
+                values = segment.column(name)
+                rows = [row for row in rows if values[row] == value]
+            if since is not None or until is not None:
+                timestamps = segment.column('timestamp')
+                rows = [
+                    row for row in rows
+                    if (since is None or timestamps[row] >= since)
+                    and (until is None or timestamps[row] <= until)
+                ]
+
+            rows = list(rows)
+            if not rows:
+                continue
+            decoded = {name: segment.column(name) for name in columns}
+            for row in rows:
+                yield {name: values[row] for name, values in decoded.items()}
+
+    def count_by(
+            self,
+            column: str,
+            since: Optional[int] = None,
+            until: Optional[int] = None
+    ) -> Counter:
+        """Count archived requests by the values of one column"""
+        counts: Counter = Counter()
+        for segment in self.segments(since, until):
+            if since is None and until is None:
+                counts.update(segment.column(column))
+            else:
+                timestamps = segment.column('timestamp')
+                counts.update(
+                    value for value, timestamp in zip(segment.column(column), timestamps)
+                    if (since is None or timestamp >= since) and (until is None or timestamp <= until)
+                )
+        return counts
+
+    def apply_retention(self) -> int:
+        """Delete segments older than the retention period, returns how many"""
+        if self.retention_days is None or not self.directory.exists():
+            return 0
+
+        cutoff = time.time() - self.retention_days * 24 * 3600
+        removed = 0
+        for segment in list(self.segments()):
+            if segment.period_end < cutoff:
+                segment.path.unlink(missing_ok=True)
+                removed += 1
+        return removed
@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Mapping, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+def request_key(url: str, params: Optional[Mapping[str, Any]] = None) -> Hashable:
+    """Build a coalescing key from request URL and query parameters"""
+    return url, tuple(sorted((str(k), str(v)) for k, v in (params or {}).items()))
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one in-flight execution"""
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run func for key, or join the call already in flight for the same key
+
+        The shared call runs as its own task, so a waiter that gets cancelled
+        (e.g. by a section timeout) doesn't cancel it for everyone else.
+
+        Args:
+            key: Identity of the call, see request_key
+            func: Factory producing the coroutine to run
+
+        Returns:
+            Result of the shared call (its exception is raised to every waiter)
+        """
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(func())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        """Drop finished call so the next one goes upstream again"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled():
+            # Mark exception as retrieved even if every waiter went away
+            task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        """Get call and coalescing counters"""
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._in_flight)
+        }
@@ -0,0 +1,158 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from models.DigestConfig import DigestConfig
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    id INTEGER PRIMARY KEY,
+    chat_id INTEGER NOT NULL,
+    user_id INTEGER,
+    city TEXT NOT NULL,
+    city_key TEXT NOT NULL,
+    local_time TEXT NOT NULL,
+    timezone TEXT NOT NULL,
+    next_run_utc REAL NOT NULL,
+    created_at REAL NOT NULL,
+    UNIQUE (chat_id, city_key)
+);
+CREATE INDEX IF NOT EXISTS subscriptions_next_run ON subscriptions (next_run_utc);
+"""
+
+_COLUMNS = "id, chat_id, user_id, city, city_key, local_time, timezone, next_run_utc"
+
+
+@dataclass
+class Subscription:
+    """Daily digest of one city for one chat"""
+    id: Optional[int]
+    chat_id: int
+    user_id: Optional[int]
+    city: str
+    city_key: str  # Normalized city name, shared by all subscribers of the city
+    local_time: str  # HH:MM in the city's timezone
+    timezone: str  # IANA name, or UTC offset in seconds when the name is unknown
+    next_run_utc: float  # Unix time of the next delivery
+
+
+class SubscriptionStore:
+    """
+    SQLite store of digest subscriptions, indexed by next delivery time
+
+    The scheduler only ever reads the rows due next, so the number of
+    subscriptions doesn't matter for a scheduling round. All calls run the
+    blocking SQLite work in a thread.
+    """
+
+    def __init__(self, config: Optional[DigestConfig] = None):
+        """Initialize store with configuration, the database is opened on first use"""
+        self.config = config or DigestConfig()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.config.store_path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.config.store_path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def _query(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _execute(self, sql: str, params: tuple = (), many: bool = False) -> int:
+        with self._lock:
+            connection = self._connect()
+            cursor = connection.executemany(sql, params) if many else connection.execute(sql, params)
+            connection.commit()
+            return cursor.rowcount
+
+    async def add(self, subscription: Subscription) -> None:
+        """Create a subscription, replacing the chat's previous one for the same city"""
+        await asyncio.to_thread(
+            self._execute,
+            "INSERT OR REPLACE INTO subscriptions "
+            "(chat_id, user_id, city, city_key, local_time, timezone, next_run_utc, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (subscription.chat_id, subscription.user_id, subscription.city, subscription.city_key,
+             subscription.local_time, subscription.timezone, subscription.next_run_utc, time.time())
+        )
+
+    async def remove(self, chat_id: int, city_key: Optional[str] = None) -> int:
+        """Remove the chat's subscription for a city, or all of them; returns the number removed"""
+        if city_key is None:
+            return await asyncio.to_thread(self._execute, "DELETE FROM subscriptions WHERE chat_id = ?", (chat_id,))
+        return await asyncio.to_thread(
+            self._execute, "DELETE FROM subscriptions WHERE chat_id = ? AND city_key = ?", (chat_id, city_key)
+        )
+
+    async def for_chat(self, chat_id: int) -> list[Subscription]:
+        """Get subscriptions of a chat"""
+        rows = await asyncio.to_thread(
+            self._query, f"SELECT {_COLUMNS} FROM subscriptions WHERE chat_id = ? ORDER BY local_time", (chat_id,)
+        )
+        return [Subscription(*row) for row in rows]
+
+    def _claim(self, now: float, limit: int, next_run: Callable[[Subscription], float]) -> list[Subscription]:
+        with self._lock:
+            connection = self._connect()
+            # Takes the database write lock, so other processes claim after us
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                due = [Subscription(*row) for row in connection.execute(
+                    f"SELECT {_COLUMNS} FROM subscriptions WHERE next_run_utc <= ? ORDER BY next_run_utc LIMIT ?",
+                    (now, limit)
+                )]
+                claimed = []
+                for subscription in due:
+                    cursor = connection.execute(
+                        "UPDATE subscriptions SET next_run_utc = ? WHERE id = ? AND next_run_utc <= ?",
+                        (next_run(subscription), subscription.id, now)
+                    )
+                    if cursor.rowcount == 1:
+                        claimed.append(subscription)
+                connection.commit()
+            except BaseException:
+                connection.rollback()
+                raise
+            return claimed
+
+    async def claim_due(
+            self,
+            now: float,
+            limit: int,
+            next_run: Callable[[Subscription], float]
+    ) -> list[Subscription]:
+        """
+        Take up to limit subscriptions whose delivery time has come
+
+        Their next delivery time is moved forward in the same transaction, so
+        every due subscription is claimed by exactly one caller, even across
+        processes sharing the database.
+
+        Args:
+            now: Unix time to claim for
+            limit: Maximum number of subscriptions claimed
+            next_run: Next delivery time of a claimed subscription
+
+        Returns:
+            Claimed subscriptions (with their previous delivery time)
+        """
+        return await asyncio.to_thread(self._claim, now, limit, next_run)
+
+    async def count(self) -> int:
+        """Get the number of subscriptions"""
+        return (await asyncio.to_thread(self._query, "SELECT COUNT(*) FROM subscriptions"))[0][0]
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict
+
+from models.FileCacheConfig import FileCacheConfig
+from utils.ErrorLogger import logEvent
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    digest TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+"""
+
+
+class TelegramFileCache:
+    """
+    Maps image content hashes to Telegram file_ids of already uploaded photos
+
+    Entries are persisted in SQLite and kept in memory in LRU order; the
+    database is loaded on first use, off the event loop. The known
+    file_ids double as a catalog of images that can be resent for free.
+    """
+
+    def __init__(self, config: Optional[FileCacheConfig] = None):
+        """Initialize cache with configuration"""
+        self.config = config or FileCacheConfig()
+        self._entries: Optional[OrderedDict[str, str]] = None
+        self._connection: Optional[sqlite3.Connection] = None
+        self._lock = asyncio.Lock()
+        # Writes run in worker threads on one connection, one at a time
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.catalog_serves = 0
+
+    @staticmethod
+    def digest(image: bytes) -> str:
+        """Content hash identifying an image"""
+        return hashlib.sha256(image).hexdigest()
+
+    def _load(self) -> OrderedDict[str, str]:
+        """
+        Open the database and read all entries, least recently used first
+
+        The file may be shared by supervisor workers; if it can't be read the
+        cache starts empty and runs in memory only.
+        """
+        with self._db_lock:
+            self.config.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                self._connection = sqlite3.connect(
+                    self.config.cache_path, timeout=self.config.busy_timeout, check_same_thread=False
+                )
+                self._connection.execute("PRAGMA journal_mode=WAL")
+                self._connection.executescript(_SCHEMA)
+                rows = self._connection.execute(
+                    "SELECT digest, file_id FROM files ORDER BY last_used"
+                ).fetchall()
+            except sqlite3.Error as e:
+                logEvent(e, self._load)
+                if self._connection is not None:
+                    self._connection.close()
+                    self._connection = None
+                return OrderedDict()
+            return OrderedDict(rows)
+
+    async def _ensure_loaded(self) -> OrderedDict[str, str]:
+        if self._entries is None:
+            async with self._lock:
+                if self._entries is None:
+                    self._entries = await asyncio.to_thread(self._load)
+        return self._entries
+
+    def _execute(self, *statements: tuple) -> None:
+        with self._db_lock:
+            if self._connection is None:
+                # Closed on shutdown, the in-memory entries are all that's left
+                return
+            try:
+                for sql, params in statements:
+                    self._connection.execute(sql, params)
+                self._connection.commit()
+            except sqlite3.Error as e:
+                # A cache write lost to a busy database only costs a re-upload later
+                self._connection.rollback()
+                logEvent(e, self._execute)
+
+    async def lookup(self, image: bytes) -> Optional[str]:
+        """
+        Get file_id of an image uploaded before
+
+        Args:
+            image: Raw image bytes
+
+        Returns:
+            Telegram file_id or None if the image wasn't sent yet
+        """
+        entries = await self._ensure_loaded()
+        digest = self.digest(image)
+        file_id = entries.get(digest)
+        if file_id is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entries.move_to_end(digest)
+        await asyncio.to_thread(
+            self._execute,
+            ("UPDATE files SET last_used = ? WHERE digest = ?", (time.time(), digest))
+        )
+        return file_id
+
+    async def remember(self, image: bytes, file_id: str) -> None:
+        """Store file_id of a freshly uploaded image, evicting the oldest entries"""
+        entries = await self._ensure_loaded()
+        digest = self.digest(image)
+        entries[digest] = file_id
+        entries.move_to_end(digest)
+
+        statements = [(
+            "INSERT OR REPLACE INTO files (digest, file_id, last_used) VALUES (?, ?, ?)",
+            (digest, file_id, time.time())
+        )]
+        while len(entries) > self.config.max_entries:
+            evicted, _ = entries.popitem(last=False)
+            statements.append(("DELETE FROM files WHERE digest = ?", (evicted,)))
+            self.evictions += 1
+        await asyncio.to_thread(self._execute, *statements)
+
+    async def forget(self, file_id: str) -> None:
+        """Drop a file_id Telegram no longer accepts"""
+        entries = await self._ensure_loaded()
+        for digest in [digest for digest, known in entries.items() if known == file_id]:
+            del entries[digest]
+            await asyncio.to_thread(self._execute, ("DELETE FROM files WHERE digest = ?", (digest,)))
+
+    async def random_file_id(self) -> Optional[str]:
+        """Pick a previously sent image from the catalog"""
+        entries = await self._ensure_loaded()
+        if not entries:
+            return None
+        self.catalog_serves += 1
+        return random.choice(list(entries.values()))
+
+    def close(self) -> None:
+        """Close the database, after any write in progress"""
+        with self._db_lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache size and hit/miss/eviction counters"""
+        return {
+            'size': len(self._entries or ()),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'catalog_serves': self.catalog_serves
+        }
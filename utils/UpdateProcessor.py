@@ -0,0 +1,130 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Dict, Hashable, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from models.UpdateProcessorConfig import UpdateProcessorConfig
+from utils.ErrorLogger import logEvent
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates from different chats concurrently, keeping per-chat order
+
+    Updates of one chat run one after another, while updates of other chats
+    proceed in parallel up to max_concurrent_updates. Updates waiting for
+    their turn form a bounded queue: once it holds max_pending_updates, new
+    updates are dropped and counted instead of piling up in memory.
+    """
+
+    def __init__(self, config: Optional[UpdateProcessorConfig] = None):
+        """
+        Initialize processor
+
+        Args:
+            config: Concurrency and queue limits
+        """
+        self.config = config or UpdateProcessorConfig()
+        # The base class semaphore only admits updates into the queue; the real
+        # in-flight limit is applied after the per-chat lock is acquired, so a
+        # chat waiting for its own previous update does not hold a slot
+        super().__init__(self.config.max_concurrent_updates + self.config.max_pending_updates + 1)
+        self._slots = asyncio.Semaphore(self.config.max_concurrent_updates)
+        self._chat_locks: Dict[Hashable, asyncio.Lock] = {}
+        self._chat_users: Dict[Hashable, int] = {}
+        self._waits: deque[float] = deque(maxlen=self.config.wait_samples)
+        self.in_flight = 0
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.processed = 0
+        self.dropped = 0
+        self.wait_max = 0.0
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Hashable]:
+        """Chat whose updates must stay ordered, None if the update has no chat"""
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    def _acquire_chat_lock(self, chat: Hashable) -> asyncio.Lock:
+        self._chat_users[chat] = self._chat_users.get(chat, 0) + 1
+        return self._chat_locks.setdefault(chat, asyncio.Lock())
+
+    def _release_chat_lock(self, chat: Hashable) -> None:
+        self._chat_users[chat] -= 1
+        if not self._chat_users[chat]:
+            del self._chat_users[chat]
+            del self._chat_locks[chat]
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Queue the update behind earlier updates of its chat and run it once a slot is free"""
+        if self.pending >= self.config.max_pending_updates:
+            self.dropped += 1
+            if hasattr(coroutine, 'close'):
+                coroutine.close()
+            logEvent(
+                RuntimeError(f"Update queue is full ({self.pending} pending), update dropped"),
+                self.do_process_update,
+                user_input=self._chat_key(update)
+            )
+            return
+
+        loop = asyncio.get_running_loop()
+        enqueued = loop.time()
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        waiting = True
+        chat = self._chat_key(update)
+        chat_lock = self._acquire_chat_lock(chat) if chat is not None else None
+        try:
+            if chat_lock is not None:
+                await chat_lock.acquire()
+            try:
+                async with self._slots:
+                    waiting = False
+                    self.pending -= 1
+                    wait = loop.time() - enqueued
+                    self._waits.append(wait)
+                    self.wait_max = max(self.wait_max, wait)
+                    self.in_flight += 1
+                    try:
+                        await coroutine
+                    finally:
+                        self.in_flight -= 1
+                        self.processed += 1
+            finally:
+                if chat_lock is not None:
+                    chat_lock.release()
+        finally:
+            if waiting:
+                self.pending -= 1
+            if chat is not None:
+                self._release_chat_lock(chat)
+
+    async def initialize(self) -> None:
+        """Nothing to allocate, locks are created per chat on demand"""
+
+    async def shutdown(self) -> None:
+        """Nothing to free, in-flight updates are awaited by the application"""
+
+    def stats(self) -> Dict[str, float]:
+        """Get queue depth, throughput and queue wait metrics (wait times in ms)"""
+        waits = sorted(self._waits)
+
+        def percentile(share: float) -> float:
+            return waits[min(int(len(waits) * share), len(waits) - 1)] * 1000 if waits else 0.0
+
+        return {
+            'in_flight': self.in_flight,
+            'pending': self.pending,
+            'max_pending_seen': self.max_pending_seen,
+            'active_chats': len(self._chat_locks),
+            'processed': self.processed,
+            'dropped': self.dropped,
+            'wait_p50_ms': percentile(0.5),
+            'wait_p95_ms': percentile(0.95),
+            'wait_max_ms': self.wait_max * 1000
+        }
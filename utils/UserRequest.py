@@ -1,57 +1,409 @@
+import atexit
+import itertools
 import json
+import os
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Sequence, Union
 
 from telegram import Update
 
 from models.UserConfig import UserLogConfig, UserRequest
+from utils.RequestArchive import RequestArchive
+
+
+class UserRequestIndex:
+    """
+    On-disk index of request log offsets by user id
+
+    The index file is a sequence of fixed-size (user_id, offset) records
+    appended alongside the log. Before its first use in a process it is
+    caught up with log lines written after the last indexed one (e.g. after
+    a crash or migration); it is loaded into memory on the first query.
+    Callers serialize access with the logger's file lock.
+    """
+
+    _RECORD = struct.Struct('<qQ')
+
+    def __init__(self, index_path: Path, log_path: Path):
+        self.index_path = index_path
+        self.log_path = log_path
+        self._offsets: Optional[dict[int, array]] = None
+        self._synced = False
+
+    def sync(self) -> None:
+        """Index log lines missing from the index file (once, before first use)"""
+        if self._synced:
+            return
+        self._synced = True
+        if self.log_path.exists():
+            self._write(self._scan_log(self._last_indexed_offset()))
+
+    def append(self, entries: Sequence[tuple[int, int]]) -> None:
+        """Record (user_id, offset) pairs of log lines appended after sync()"""
+        self._write(entries)
+
+    def offsets_for(self, user_id: int) -> Sequence[int]:
+        """Get log offsets of all requests from a user, oldest first"""
+        if self._offsets is None:
+            self._load()
+        return self._offsets.get(user_id, ())
+
+    def reset(self) -> None:
+        """Drop the index; it is rebuilt from the log on next use"""
+        self.index_path.unlink(missing_ok=True)
+        self._offsets = None
+        self._synced = False
+
+    def _write(self, entries: Sequence[tuple[int, int]]) -> None:
+        if not entries:
+            return
+        with open(self.index_path, 'ab') as index_file:
+            index_file.write(b''.join(self._RECORD.pack(*entry) for entry in entries))
+        if self._offsets is not None:
+            self._remember(entries)
+
+    def _remember(self, entries) -> None:
+        for user_id, offset in entries:
+            self._offsets.setdefault(user_id, array('Q')).append(offset)
+
+    def _last_indexed_offset(self) -> int:
+        """Get log offset of the last indexed line (-1 if none)"""
+        if not self.index_path.exists():
+            return -1
+
+        with open(self.index_path, 'r+b') as index_file:
+            size = index_file.seek(0, os.SEEK_END)
+            usable = size - size % self._RECORD.size
+            if usable != size:
+                # Torn record from an interrupted write
+                index_file.truncate(usable)
+            if usable == 0:
+                return -1
+            index_file.seek(usable - self._RECORD.size)
+            return self._RECORD.unpack(index_file.read(self._RECORD.size))[1]
+
+    def _load(self) -> None:
+        """Read the whole index file into memory"""
+        self.sync()
+        self._offsets = {}
+        if self.index_path.exists():
+            self._remember(self._RECORD.iter_unpack(self.index_path.read_bytes()))
+
+    def _scan_log(self, last_offset: int) -> list[tuple[int, int]]:
+        """Collect (user_id, offset) of complete log lines after last_offset"""
+        entries = []
+        with open(self.log_path, 'rb') as log_file:
+            if last_offset >= 0:
+                log_file.seek(last_offset)
+                log_file.readline()
+            while True:
+                offset = log_file.tell()
+                line = log_file.readline()
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entries.append((json.loads(line)['user']['id'], offset))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return entries
 
 
 class UserRequestLogger:
-    """Handler for logging user requests"""
+    """
+    Handler for logging user requests
+
+    Requests are kept in an in-memory buffer and appended to a JSON Lines
+    file by a background writer, either every flush_interval seconds or as
+    soon as flush_batch_size requests are waiting. When a request falls into
+    a new segment period the active log is sealed, and the writer compacts
+    sealed logs into the columnar RequestArchive.
+    """
 
     def __init__(self, config: Optional[UserLogConfig] = None):
         self.config = config or UserLogConfig()
+        self._buffer: list[dict] = []
+        self._buffer_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        # Set by a seal; also compact on start for logs sealed before a restart
+        self._compaction_due = True
+        self._last_compaction = 0.0
+        self._index = UserRequestIndex(self.config.index_path, self.config.log_path)
+        self.archive = RequestArchive(self.config.archive_path, self.config.retention_days)
+
         self._ensure_log_directory()
+        self._migrate_legacy_log()
+        self._active_period = self._read_active_period()
+
+        self._writer = threading.Thread(
+            target=self._write_loop,
+            name='UserRequestWriter',
+            daemon=True
+        )
+        self._writer.start()
+        atexit.register(self.close)
 
     def _ensure_log_directory(self) -> None:
         """Create log directory if it doesn't exist"""
-        Path(self.config.log_directory).mkdir(exist_ok=True)
+        self.config.directory.mkdir(parents=True, exist_ok=True)
+
+    def _migrate_legacy_log(self) -> None:
+        """Convert the old JSON array log into JSON Lines (runs once)"""
+        legacy_path = self.config.legacy_log_path
+        if self.config.worker_index not in (None, 0) or not legacy_path.exists():
+            # Under the supervisor only the first worker takes the legacy log over
+            return
 
-        if not self.config.log_path.exists():
-            self.config.log_path.write_text('[]')
+        try:
+            records = json.loads(legacy_path.read_text(encoding='utf-8') or '[]')
+        except json.JSONDecodeError as e:
+            print(f"Error migrating user request log: {e}")
+            return
+
+        # Legacy records go first, anything already written as JSONL after them
+        tmp_path = self.config.log_path.with_suffix('.migrating')
+        with open(tmp_path, 'w', encoding='utf-8') as tmp_file:
+            for record in records:
+                tmp_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            if self.config.log_path.exists():
+                with open(self.config.log_path, encoding='utf-8') as current_file:
+                    for line in current_file:
+                        tmp_file.write(line)
+
+        os.replace(tmp_path, self.config.log_path)
+        self._index.reset()
+        legacy_path.rename(legacy_path.with_name(legacy_path.name + '.migrated'))
+
+    def _period_of(self, timestamp: str) -> int:
+        """Get start (epoch seconds) of the segment period a timestamp falls into"""
+        epoch = int(datetime.strptime(timestamp, self.config.date_format).timestamp())
+        return epoch - epoch % self.config.segment_seconds
+
+    def _read_active_period(self) -> Optional[int]:
+        """Get the period of the active log from its first record"""
+        try:
+            with open(self.config.log_path, 'rb') as log_file:
+                first_line = log_file.readline()
+            return self._period_of(json.loads(first_line)['timestamp']) if first_line else None
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading user request log period: {e}")
+            return None
 
     def log_request(self, update: Update) -> None:
-        """Log user request to file"""
+        """Buffer user request for the background writer"""
         try:
-            # Create request object
             request = UserRequest.from_update(update)
 
-            # Read existing logs
-            try:
-                logs = json.loads(self.config.log_path.read_text())
-            except json.JSONDecodeError:
-                logs = []
-
-            # Append new request
-            logs.append(request.to_dict())
+            with self._buffer_lock:
+                self._buffer.append(request.to_dict())
+                full = len(self._buffer) >= self.config.flush_batch_size
 
-            # Write updated logs
-            self.config.log_path.write_text(
-                json.dumps(logs, indent=2, ensure_ascii=False)
-            )
+            if full:
+                self._wakeup.set()
 
         except Exception as e:
             print(f"Error logging user request: {e}")
 
-    def get_user_history(self, user_id: int) -> list[dict]:
-        """Get all requests from specific user"""
+    def _write_loop(self) -> None:
+        """Flush buffered requests periodically or when the buffer fills up"""
+        while not self._closed:
+            self.flush()
+            # Retention walks every archive segment, so not on every flush
+            if self._compaction_due or time.monotonic() - self._last_compaction >= self.config.compaction_interval:
+                self._compaction_due = False
+                self._last_compaction = time.monotonic()
+                self._compact_sealed_logs()
+            self._wakeup.wait(self.config.flush_interval)
+            self._wakeup.clear()
+
+    def flush(self) -> None:
+        """Append all buffered requests to the log file, sealing it on period change"""
+        with self._buffer_lock:
+            batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+
+        try:
+            with self._file_lock:
+                for period, records in itertools.groupby(
+                        batch, key=lambda record: self._period_of(record['timestamp'])
+                ):
+                    if self._active_period is not None and period != self._active_period:
+                        self._seal_active_log()
+                    self._append(records)
+                    self._active_period = period
+        except Exception as e:
+            print(f"Error writing user requests: {e}")
+
+    def _append(self, records: Iterator[dict]) -> None:
+        """Append records to the active log and index them (file lock held)"""
+        lines = [
+            (record['user']['id'], (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8'))
+            for record in records
+        ]
+        self._index.sync()
+        with open(self.config.log_path, 'ab') as log_file:
+            offset = log_file.tell()
+            entries = []
+            for user_id, line in lines:
+                entries.append((user_id, offset))
+                offset += len(line)
+            log_file.write(b''.join(line for _, line in lines))
+        self._index.append(entries)
+
+    def _seal_active_log(self) -> None:
+        """Move the active log aside for compaction (file lock held)"""
+        sealed_path = self.config.log_path.with_name(
+            f"{self.config.log_path.name}.{self._active_period}.sealed"
+        )
+        os.replace(self.config.log_path, sealed_path)
+        self._index.reset()
+        self._active_period = None
+        self._compaction_due = True
+        self._wakeup.set()
+
+    def _compact_sealed_logs(self) -> None:
+        """Compact sealed logs into archive segments and apply retention"""
+        pattern = f"{self.config.log_path.name}.*.sealed"
+        for sealed_path in sorted(self.config.log_path.parent.glob(pattern)):
+            try:
+                period = int(sealed_path.name.split('.')[-2])
+                with open(sealed_path, encoding='utf-8') as sealed_file:
+                    self.archive.write_segment(
+                        (json.loads(line) for line in sealed_file if line.strip()),
+                        period_start=period,
+                        period_end=period + self.config.segment_seconds,
+                        date_format=self.config.date_format
+                    )
+                sealed_path.unlink()
+            except Exception as e:
+                print(f"Error archiving user requests {sealed_path}: {e}")
+
+        try:
+            self.archive.apply_retention()
+        except Exception as e:
+            print(f"Error applying user request retention: {e}")
+
+    def close(self) -> None:
+        """Stop the background writer and flush what is left"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+
+    def _active_history(
+            self,
+            user_id: int,
+            since: Optional[str],
+            until: Optional[str],
+            newest_first: bool
+    ) -> Iterator[dict]:
+        """Read a user's records from the active log through the offset index"""
+        with self._file_lock:
+            if not self.config.log_path.exists():
+                return
+            offsets = self._index.offsets_for(user_id)
+            if newest_first:
+                offsets = reversed(offsets)
+
+            with open(self.config.log_path, 'rb') as log_file:
+                for position in offsets:
+                    log_file.seek(position)
+                    record = json.loads(log_file.readline())
+                    timestamp = record['timestamp']
+
+                    # Timestamps sort lexicographically, per-user records are chronological
+                    if since is not None and timestamp < since:
+                        if newest_first:
+                            break
+                        continue
+                    if until is not None and timestamp > until:
+                        if newest_first:
+                            continue
+                        break
+                    yield record
+
+    def _archived_history(
+            self,
+            user_id: int,
+            since: Optional[str],
+            until: Optional[str],
+            newest_first: bool
+    ) -> Iterator[dict]:
+        """Read a user's records from the archive (only archived columns are kept)"""
+        since_epoch, until_epoch = (
+            int(datetime.strptime(bound, self.config.date_format).timestamp()) if bound else None
+            for bound in (since, until)
+        )
+        rows = list(self.archive.scan(
+            columns=['timestamp', 'chat_id', 'chat_type', 'city'],
+            since=since_epoch,
+            until=until_epoch,
+            where={'user_id': user_id}
+        ))
+        if newest_first:
+            rows.reverse()
+
+        for row in rows:
+            yield {
+                'timestamp': datetime.fromtimestamp(row['timestamp']).strftime(self.config.date_format),
+                'user': {'id': user_id},
+                'chat': {'id': row['chat_id'], 'type': row['chat_type']},
+                'message': {'text': row['city']}
+            }
+
+    def get_user_history(
+            self,
+            user_id: int,
+            since: Optional[Union[datetime, str]] = None,
+            until: Optional[Union[datetime, str]] = None,
+            limit: Optional[int] = None,
+            offset: int = 0,
+            newest_first: bool = False
+    ) -> list[dict]:
+        """
+        Get requests from specific user
+
+        Records of the active log are read through the offset index; older,
+        archived records only carry the archived columns (timestamp, chat,
+        normalized city) and are only scanned if still needed.
+
+        Args:
+            user_id: Telegram user id
+            since: Only requests at or after this time
+            until: Only requests at or before this time
+            limit: Maximum number of requests returned
+            offset: Number of matching requests to skip (for pagination)
+            newest_first: Return most recent requests first
+
+        Returns:
+            List of request records
+        """
+        self.flush()
+        since, until = (
+            bound.strftime(self.config.date_format) if isinstance(bound, datetime) else bound
+            for bound in (since, until)
+        )
+
+        active = self._active_history(user_id, since, until, newest_first)
+        archived = self._archived_history(user_id, since, until, newest_first)
+        records = itertools.chain(active, archived) if newest_first else itertools.chain(archived, active)
+
         try:
-            logs = json.loads(self.config.log_path.read_text())
-            return [
-                log for log in logs
-                if log['user']['id'] == user_id
-            ]
+            stop = None if limit is None else offset + limit
+            return list(itertools.islice(records, offset, stop))
         except Exception as e:
             print(f"Error retrieving user history: {e}")
-            return []
\ No newline at end of file
+            return []
+        finally:
+            active.close()